@@ -14,11 +14,12 @@ def main():
         if appname.startswith("_"):
             raise AttributeError
 
-        initializer = import_module("streamdeckd.commands." + appname.lower())
+        module = appname.lower().replace("-", "_")
+        initializer = import_module("streamdeckd.commands." + module)
         initializer.main()
     except (ImportError, AttributeError):
         try:
-            find_spec("streamdeckd.commands." + appname.lower())
+            find_spec("streamdeckd.commands." + appname.lower().replace("-", "_"))
         except ModuleNotFoundError:
             print("Unknown command", appname)
         else:
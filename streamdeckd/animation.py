@@ -0,0 +1,121 @@
+import asyncio
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Optional, Dict, Tuple, Sequence, Union, Any
+
+
+class Animation:
+    __slots__ = ("frames", "durations", "ends", "total")
+
+    def __init__(self, frames: Sequence[bytes], durations: Sequence[int]):
+        self.frames = tuple(frames)
+        self.durations = tuple(duration / 1000 for duration in durations)
+        self.ends = tuple(accumulate(self.durations))
+        self.total = self.ends[-1]
+
+    def frame_at(self, elapsed: float) -> Tuple[int, float]:
+        offset = elapsed % self.total
+        index = min(bisect_right(self.ends, offset), len(self.frames) - 1)
+        return index, self.ends[index] - offset
+
+    def __getstate__(self):
+        return self.frames, self.durations
+
+    def __setstate__(self, state):
+        self.frames, self.durations = state
+        self.ends = tuple(accumulate(self.durations))
+        self.total = self.ends[-1]
+
+
+def frame_size(raw: Union[bytes, Animation]) -> int:
+    if isinstance(raw, Animation):
+        return sum(len(frame) for frame in raw.frames)
+    return len(raw)
+
+
+class _Playback:
+    __slots__ = ("display", "key", "animation", "start", "index")
+
+    def __init__(self, display: Any, key: int, animation: Animation, start: float):
+        self.display = display
+        self.key = key
+        self.animation = animation
+        self.start = start
+        self.index = -1
+
+
+class AnimationClock:
+
+    def __init__(self):
+        self.playing: Dict[Tuple[int, int], _Playback] = {}
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._deadline: Optional[float] = None
+
+        self.frames_shown = 0
+        self.frames_paused = 0
+
+    def play(self, display: Any, key: int, animation: Animation) -> None:
+        playback = self.playing.get((id(display), key), None)
+        if playback is not None and playback.animation is animation:
+            return
+
+        loop = asyncio.get_running_loop()
+        self.playing[(id(display), key)] = _Playback(display, key, animation, loop.time())
+        self._tick()
+
+    def stop(self, display: Any, key: int) -> None:
+        self.playing.pop((id(display), key), None)
+        if not self.playing:
+            self._cancel()
+
+    def stop_display(self, display: Any) -> None:
+        for ident in [ident for ident, playback in self.playing.items() if playback.display is display]:
+            del self.playing[ident]
+        if not self.playing:
+            self._cancel()
+
+    def _cancel(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+            self._deadline = None
+
+    def _tick(self) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+
+        deadline = None
+        for playback in self.playing.values():
+            index, remaining = playback.animation.frame_at(now - playback.start)
+            if deadline is None or now + remaining < deadline:
+                deadline = now + remaining
+            if index == playback.index:
+                continue
+
+            display = playback.display
+            if not display._opened or not display.brightness:
+                self.frames_paused += 1
+                continue
+
+            playback.index = index
+            display.shadow.set_key_image(playback.key, playback.animation.frames[index])
+            self.frames_shown += 1
+
+        if deadline is None or deadline == self._deadline:
+            return
+        if self._handle is not None:
+            self._handle.cancel()
+        self._deadline = deadline
+        self._handle = loop.call_at(deadline, self._run)
+
+    def _run(self) -> None:
+        self._handle = None
+        self._deadline = None
+        self._tick()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "playing": len(self.playing),
+            "frames_shown": self.frames_shown,
+            "frames_paused": self.frames_paused
+        }
@@ -1,16 +1,28 @@
 import sys
+import time
+import signal
+import asyncio
 import logging
 import traceback
 from typing import Optional, List, Callable, Awaitable, Set, Any, Dict
+from concurrent.futures import Executor
 from asyncio import get_event_loop, get_running_loop, AbstractEventLoop
 
-import crossplane
 import aiorun
 
+from streamdeckd import cache
+from streamdeckd.cache import LRUCache
+from streamdeckd.animation import AnimationClock, frame_size
 from streamdeckd.scheduler import Scheduler
-from streamdeckd.variables import Variables
+from streamdeckd.utils import StatsValues
+from streamdeckd.variables import Variables, ObservableDict
+from streamdeckd.recorder import Recorder
+from streamdeckd import assets
 from streamdeckd.devices import get_default_source, DeviceSource
-from streamdeckd.display import Display
+from streamdeckd.display import Display, preload_fonts
+
+
+FRAME_CACHE_SIZE = 8*1024*1024
 
 
 MAIN_PLUGINS = [
@@ -22,8 +34,10 @@ MAIN_PLUGINS = [
 
 class Streamdeckd:
 
-    def __init__(self, config_file: str):
+    def __init__(self, config_file: str, config_cache: bool=True, source: Optional[DeviceSource]=None):
         self.config_file = config_file
+        self.config_cache = config_cache
+        self.source = source
         self.logger = logging.getLogger("streamdeckd")
 
         self._bootstrap_commands: Optional[List[Callable[[], Awaitable[None]]]] = []
@@ -31,36 +45,81 @@ class Streamdeckd:
         self.variables: Optional[Variables] = None
         self.scheduler: Optional[Scheduler] = None
         self.scanner: Optional[DeviceSource] = None
-
+        self.render_pool: Optional[Executor] = None
+        self.frame_cache: Optional[LRUCache[Any, Any]] = cache.register("frames", LRUCache(FRAME_CACHE_SIZE, sizeof=frame_size))
+        self.animations = AnimationClock()
+
+        self.stats: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self.variable_maps: Dict[str, ObservableDict] = {}
+        self.recorder: Optional[Recorder] = None
+        self.exit_handler: Optional[Callable[[], None]] = None
+        self.hermetic = False
+        self.phases: Dict[str, float] = {}
+
+        self.config: Optional[Any] = None
         self.displays: List[Any] = []
         self.plugins: List[Any] = []
+        self._reload_lock = asyncio.Lock()
 
         self._controlled_devices: Dict[str, Display] = {}
         self._known_devices: Set[str] = set()
 
+    def get_stat(self, name: str) -> Any:
+        for section, cb in self.stats.items():
+            if name.startswith(section + "."):
+                return cb().get(name[len(section)+1:], "")
+        return ""
+
+    def request_exit(self) -> None:
+        if self.exit_handler is not None:
+            self.exit_handler()
+            return
+        get_running_loop().stop()
+
+    def find_display_context(self, deck: Any) -> Optional[Any]:
+        for display_ctx in self.displays:
+            if display_ctx.matches(deck):
+                return display_ctx
+        for display_ctx in self.displays:
+            if display_ctx.default:
+                return display_ctx
+        return None
+
     async def when_connect(self, identifier: str):
         self.logger.debug(f"Found device: {identifier}")
         deck = self.scanner.get_scanned(identifier)
 
-        for display_ctx in self.displays:
-            if display_ctx.matches(deck):
-                break
-        else:
-            for display_ctx in self.displays:
-                if display_ctx.default:
-                    break
-            else:
-                self.logger.info(f"Got unconfigured device: {identifier}")
-                return
+        display_ctx = self.find_display_context(deck)
+        if display_ctx is None:
+            self.logger.info(f"Got unconfigured device: {identifier}")
+            return
+
+        await self.prefetch_assets([deck])
 
-        disp = Display(self, display_ctx, deck)
+        disp = Display(self, display_ctx, deck, self.scanner.get_info(identifier))
         self._controlled_devices[identifier] = disp
-        disp.open()
+        await disp.open()
+
+        if self.recorder is not None:
+            fmt = deck.key_image_format()
+            self.recorder.deck(identifier, disp.d_vars["serial_number"], deck.deck_type(), fmt["format"], deck.key_layout())
+
+    async def preload_fonts(self) -> None:
+        start = time.perf_counter()
+        fonts = set()
+        for display_ctx in self.displays:
+            fonts |= display_ctx.fonts()
+        await get_running_loop().run_in_executor(None, preload_fonts, sorted(fonts))
+        self.phases["fonts"] = time.perf_counter() - start
+
+    async def prefetch_assets(self, decks: List[Any]) -> None:
+        sizes = {tuple(deck.key_image_format()["size"]) for deck in decks}
+        await get_running_loop().run_in_executor(None, assets.STORE.prefetch, sizes)
 
     async def when_disconnect(self, identifier: str):
         self.logger.debug(f"Lost device: {identifier}")
         if identifier in self._controlled_devices:
-            self._controlled_devices.pop(identifier).close()
+            await self._controlled_devices.pop(identifier).close()
 
     async def perform_rescan(self):
         self.logger.debug("Performing rescan.")
@@ -75,29 +134,97 @@ class Streamdeckd:
         for dev in new:
             await self.when_connect(dev)
 
-    def parse_configuration(self):
-        if self.config_file is None:
-            self.logger.critical("Could not find config file.")
-            sys.exit(1)
+    def _parse_block(self) -> Optional[List[dict]]:
+        from streamdeckd.config import cache
 
-        parsed = crossplane.parse(self.config_file, combine=True)
+        start = time.perf_counter()
+        parsed, cached = cache.parse(self.config_file, use_cache=self.config_cache)
+        self.phases["cached" if cached else "parse"] = time.perf_counter() - start
         if parsed["status"] != "ok":
             self.logger.critical("Failed to parse the configuration file.")
             for error in parsed["errors"]:
                 self.logger.critical(f"In {error['file']} on {error['line']}: {error['error']!r}")
-                sys.exit(1)
-        block = parsed["config"][0]['parsed']
+            return None
+        return parsed["config"][0]['parsed']
 
+    def _compile_block(self, block: List[dict]) -> Any:
+        start = time.perf_counter()
         from streamdeckd.config.application import ApplicationContext
         ctx = ApplicationContext(self)
         for plugin in MAIN_PLUGINS:
             ctx.apply_directive("load", (plugin,), None)
         ctx.apply_block(block)
+        self.phases["compile"] = time.perf_counter() - start
+        return ctx
 
+    def parse_configuration(self):
+        if self.config_file is None:
+            self.logger.critical("Could not find config file.")
+            sys.exit(1)
+
+        block = self._parse_block()
+        if block is None:
+            sys.exit(1)
+
+        ctx = self._compile_block(block)
+        self.config = ctx
+        self.displays = ctx.displays
         self.plugins = ctx.modules
 
+        start = time.perf_counter()
         ctx.prepare()
         self._bootstrap_commands.append(ctx.apply)
+        self.phases["prepare"] = time.perf_counter() - start
+
+    def log_phases(self):
+        for phase, duration in self.phases.items():
+            self.logger.info(f"Startup phase {phase}: {duration*1000:.1f}ms")
+
+    async def reload(self):
+        async with self._reload_lock:
+            self.logger.info("Reloading configuration...")
+            block = self._parse_block()
+            if block is None:
+                self.logger.error("Keeping the current configuration.")
+                return
+
+            try:
+                ctx = self._compile_block(block)
+            except Exception as e:
+                self.logger.error(f"Failed to load the configuration, keeping the current one: {e!r}")
+                return
+
+            await ctx.reload(self.config)
+            ctx.configure_caches()
+            for module in self.plugins:
+                if module not in ctx.modules:
+                    await module.stop(self)
+            for module in ctx.modules:
+                if module not in self.plugins:
+                    await module.start(self)
+            if self.recorder is not None:
+                self.recorder.watch(self.variable_maps)
+
+            self.config = ctx
+            self.displays = ctx.displays
+            self.plugins = ctx.modules
+            await self.preload_fonts()
+
+            for disp in self.displays:
+                disp.apply_devices(self.scanner)
+
+            await self.prefetch_assets([display.deck for display in self._controlled_devices.values()])
+            for identifier, display in list(self._controlled_devices.items()):
+                display_ctx = self.find_display_context(display.deck)
+                if display_ctx is None:
+                    await self.when_disconnect(identifier)
+                else:
+                    display.reload(display_ctx)
+
+            for identifier in self._known_devices - set(self._controlled_devices):
+                await self.when_connect(identifier)
+
+            self.logger.info("Configuration reloaded.")
 
     async def _start(self):
         try:
@@ -111,24 +238,54 @@ class Streamdeckd:
     async def run(self):
         self.variables = Variables()
         self.scheduler = Scheduler(get_running_loop())
-        self.scanner = get_default_source()
+        self.scanner = self.source if self.source is not None else get_default_source()
+
+        self.variables.add_map({"stats": StatsValues(self.get_stat)})
+        self.stats["scheduler"] = self.scheduler.stats
+        self.stats["cache"] = cache.stats
+        self.stats["assets"] = assets.STORE.stats
+        self.stats["animations"] = self.animations.stats
+
+        self.stats["startup"] = lambda: self.phases
+        if hasattr(signal, "SIGHUP"):
+            get_running_loop().add_signal_handler(signal.SIGHUP, lambda: get_running_loop().create_task(self.reload()))
+
+        if self.recorder is not None:
+            self.recorder.open()
 
         self.logger.info("Booting up...") 
+        start = time.perf_counter()
         for command in self._bootstrap_commands:
             await command()
         self._bootstrap_commands = None
+        self.phases["bootstrap"] = time.perf_counter() - start
 
+        start = time.perf_counter()
         for module in self.plugins:
             await module.start(self)
+        self.phases["plugins"] = time.perf_counter() - start
+
+        await self.preload_fonts()
+
+        if self.recorder is not None:
+            self.recorder.watch(self.variable_maps)
 
         for disp in self.displays:
             disp.apply_devices(self.scanner)
 
         self.logger.info("Boot completed.")
 
+        start = time.perf_counter()
         await self.perform_rescan()
+        self.phases["devices"] = time.perf_counter() - start
+
+        self.log_phases()
 
     async def end(self):
+        for job in self.scheduler.jobs.values():
+            stats = job.stats()
+            if stats["overruns"]:
+                self.logger.info(f"Job {job.name} overran {stats['overruns']} of {stats['runs'] + stats['skipped']} ticks (p99 {stats['duration_p99']*1000:.1f}ms for a period of {job.period*1000:.0f}ms)")
         self.scheduler.close()
         for dev in list(self._known_devices):
             await self.when_disconnect(dev)
@@ -136,6 +293,20 @@ class Streamdeckd:
         for module in self.plugins:
             await module.stop(self)
 
+        if self.scanner is not None:
+            self.scanner.close()
+
+        if self.recorder is not None:
+            self.recorder.close()
+
+        assets.STORE.save_index()
+
+        if self.render_pool is not None:
+            self.render_pool.shutdown(wait=False)
+
+        for name, lru in cache.CACHES.items():
+            self.logger.info(f"Cache {name}: {lru.hits} hits, {lru.misses} misses, {lru.evictions} evictions, {lru.size:,} bytes in {len(lru)} entries")
+
     def start(self) -> int:
         self.parse_configuration()
         loop = get_event_loop()
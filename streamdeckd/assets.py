@@ -0,0 +1,216 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Optional, Dict, List, Tuple, Iterable, Any
+
+from PIL import Image
+
+from streamdeckd import cache
+from streamdeckd.cache import LRUCache
+
+
+Size = Tuple[int, int]
+
+
+class Asset:
+    __slots__ = ("path", "digest", "durations")
+
+    def __init__(self, path: str, digest: str, durations: Tuple[int, ...]=()):
+        self.path = path
+        self.digest = digest
+        self.durations = durations
+
+    @property
+    def animated(self) -> bool:
+        return len(self.durations) > 1
+
+    def fitted(self, size: Size) -> Image.Image:
+        return STORE.fitted(self, size)
+
+    def frames(self, size: Size) -> Tuple[Image.Image, ...]:
+        return STORE.frames(self, size)
+
+    def __repr__(self) -> str:
+        return f"<Asset {self.path} {self.digest[:12]}>"
+
+
+def decode(path: str, size: Size) -> Image.Image:
+    with Image.open(path) as img:
+        if img.format == "JPEG":
+            img.draft("RGB", size)
+        img.load()
+        mode = "RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB"
+        return img.convert(mode).resize(size, Image.BICUBIC)
+
+
+def frame_durations(path: str) -> Tuple[int, ...]:
+    with Image.open(path) as img:
+        if not getattr(img, "is_animated", False):
+            return ()
+
+        durations = []
+        for index in range(img.n_frames):
+            img.seek(index)
+            img.load()
+            duration = int(img.info.get("duration", 0) or 0)
+            durations.append(duration if duration > 10 else 100)
+        return tuple(durations)
+
+
+def decode_frames(path: str, size: Size) -> Tuple[Image.Image, ...]:
+    frames = []
+    with Image.open(path) as img:
+        for index in range(getattr(img, "n_frames", 1)):
+            img.seek(index)
+            frames.append(img.convert("RGBA").resize(size, Image.BICUBIC))
+    return tuple(frames)
+
+
+class AssetStore:
+
+    def __init__(self, directory: Optional[str]=None, max_bytes: int=16*1024*1024):
+        self.directory = directory
+        self.memory: LRUCache[Tuple[str, Size], Image.Image] = LRUCache(max_bytes, sizeof=lambda img: img.width * img.height * len(img.getbands()))
+        self.animations: LRUCache[Tuple[str, Size], Tuple[Image.Image, ...]] = LRUCache(max_bytes, sizeof=lambda frames: sum(img.width * img.height * 4 for img in frames))
+        self.assets: Dict[str, Asset] = {}
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger("streamdeckd.assets")
+
+        self._index: Optional[Dict[str, List[Any]]] = None
+        self._index_dirty = False
+
+        self.decoded = 0
+        self.disk_hits = 0
+
+    def _directory(self) -> str:
+        if self.directory is None:
+            from streamdeckd.config.cache import cache_dir
+            self.directory = os.path.join(cache_dir(), "assets")
+        return self.directory
+
+    def _load_index(self) -> Dict[str, List[Any]]:
+        if self._index is None:
+            try:
+                with open(os.path.join(self._directory(), "index.json"), "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def save_index(self) -> None:
+        with self.lock:
+            if not self._index_dirty:
+                return
+            index = dict(self._load_index())
+            self._index_dirty = False
+
+        path = os.path.join(self._directory(), "index.json")
+        try:
+            os.makedirs(self._directory(), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def open(self, path: str) -> Asset:
+        path = os.path.abspath(path)
+        st = os.stat(path)
+
+        with self.lock:
+            index = self._load_index()
+            entry = index.get(path, None)
+        if entry is not None and len(entry) == 4 and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            digest = entry[2]
+            durations = tuple(entry[3])
+        else:
+            with open(path, "rb") as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            durations = frame_durations(path)
+            with self.lock:
+                index[path] = [st.st_mtime_ns, st.st_size, digest, list(durations)]
+                self._index_dirty = True
+
+        asset = self.assets.get(path, None)
+        if asset is None or asset.digest != digest:
+            asset = Asset(path, digest, durations)
+            self.assets[path] = asset
+        return asset
+
+    def _variant_path(self, digest: str, size: Size) -> str:
+        return os.path.join(self._directory(), f"{digest}-{size[0]}x{size[1]}.png")
+
+    def fitted(self, asset: Asset, size: Size) -> Image.Image:
+        size = (int(size[0]), int(size[1]))
+        key = (asset.digest, size)
+        img = self.memory.get(key)
+        if img is not None:
+            return img
+
+        img = self._load_variant(asset, size)
+        img.info["streamdeckd.digest"] = f"{asset.digest}@{size[0]}x{size[1]}"
+        self.memory.put(key, img)
+        return img
+
+    def frames(self, asset: Asset, size: Size) -> Tuple[Image.Image, ...]:
+        size = (int(size[0]), int(size[1]))
+        key = (asset.digest, size)
+        frames = self.animations.get(key)
+        if frames is not None:
+            return frames
+
+        frames = decode_frames(asset.path, size)
+        self.decoded += 1
+        for index, img in enumerate(frames):
+            img.info["streamdeckd.digest"] = f"{asset.digest}#{index}@{size[0]}x{size[1]}"
+        self.animations.put(key, frames)
+        return frames
+
+    def _load_variant(self, asset: Asset, size: Size) -> Image.Image:
+        path = self._variant_path(asset.digest, size)
+        try:
+            with Image.open(path) as cached:
+                cached.load()
+                img = cached.copy()
+            self.disk_hits += 1
+            return img
+        except (OSError, ValueError):
+            pass
+
+        img = decode(asset.path, size)
+        self.decoded += 1
+        try:
+            os.makedirs(self._directory(), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            img.save(tmp, format="PNG")
+            os.replace(tmp, path)
+        except OSError as e:
+            self.logger.debug(f"Could not store {path}: {e}")
+        return img
+
+    def prefetch(self, sizes: Iterable[Size], assets: Optional[Iterable[Asset]]=None) -> None:
+        sizes = list(sizes)
+        for asset in list(assets if assets is not None else self.assets.values()):
+            for size in sizes:
+                try:
+                    self.fitted(asset, size)
+                    if asset.animated:
+                        self.frames(asset, size)
+                except OSError as e:
+                    self.logger.warning(f"Could not prepare {asset.path}: {e}")
+        self.save_index()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "assets": len(self.assets),
+            "decoded": self.decoded,
+            "disk_hits": self.disk_hits
+        }
+
+
+STORE = AssetStore()
+cache.register("assets", STORE.memory)
+cache.register("animations", STORE.animations)
@@ -0,0 +1,115 @@
+import threading
+from collections import OrderedDict
+from typing import Generic, TypeVar, Hashable, Callable, Optional, Dict, Any, Tuple
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[V], int]=len, max_entries: Optional[int]=None):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.sizeof = sizeof
+        self.lock = threading.RLock()
+
+        self.data: 'OrderedDict[K, V]' = OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: K, default: Optional[V]=None) -> Optional[V]:
+        with self.lock:
+            if key not in self.data:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self.data.move_to_end(key)
+            return self.data[key]
+
+    def put(self, key: K, value: V) -> None:
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            if key in self.data:
+                self.size -= self.sizeof(self.data.pop(key))
+
+            self.data[key] = value
+            self.size += size
+            self._evict()
+
+    def _evict(self) -> None:
+        while self.data and (self.size > self.max_bytes or (self.max_entries is not None and len(self.data) > self.max_entries)):
+            _, evicted = self.data.popitem(last=False)
+            self.size -= self.sizeof(evicted)
+            self.evictions += 1
+
+    def resize(self, max_bytes: Optional[int]=None, max_entries: Optional[int]=None) -> None:
+        with self.lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self.max_entries = max_entries
+            self._evict()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.data.clear()
+            self.size = 0
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self.data
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.data),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries
+        }
+
+
+CACHES: Dict[str, LRUCache[Any, Any]] = {}
+_DEFAULTS: Dict[str, Tuple[int, Optional[int]]] = {}
+
+
+def register(name: str, cache: LRUCache[K, V]) -> LRUCache[K, V]:
+    CACHES[name] = cache
+    _DEFAULTS[name] = (cache.max_bytes, cache.max_entries)
+    return cache
+
+
+def unregister(name: str) -> None:
+    CACHES.pop(name, None)
+    _DEFAULTS.pop(name, None)
+
+
+def configure(budgets: Dict[str, Tuple[Optional[int], Optional[int]]]) -> None:
+    for name, cache in CACHES.items():
+        max_bytes, max_entries = _DEFAULTS[name]
+        configured_bytes, configured_entries = budgets.get(name, (None, None))
+        cache.resize(
+            max_bytes=configured_bytes if configured_bytes is not None else max_bytes,
+            max_entries=configured_entries if configured_entries is not None else max_entries
+        )
+
+
+def stats() -> Dict[str, Any]:
+    result: Dict[str, Any] = {}
+    for name, cache in list(CACHES.items()):
+        for key, value in cache.stats().items():
+            result[f"{name}.{key}"] = value
+    return result
@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import itertools
+from typing import Callable, Dict, Any
+
+from PIL import Image
+from StreamDeck.ImageHelpers import PILHelper
+
+from streamdeckd import cache
+from streamdeckd.state import compile_plan
+from streamdeckd.variables import Variables, ObservableDict
+from streamdeckd.display import KeyFormat, draw_key
+from streamdeckd.virtual import DECK_TYPES, VirtualStreamDeck
+
+
+def measure(func: Callable[[], Any], duration: float, batch: int=100) -> float:
+    calls = 0
+    start = time.perf_counter()
+    end = start + duration
+    while True:
+        for _ in range(batch):
+            func()
+        calls += batch
+
+        now = time.perf_counter()
+        if now >= end:
+            return calls / (now - start)
+
+
+def bench_templates(args: argparse.Namespace) -> Dict[str, float]:
+    app_vars = Variables()
+    per_map = max(args.variables // 4, 1)
+    for m in range(4):
+        app_vars.add_map(ObservableDict({f"var{m}_{i}": f"value {i}" for i in range(per_map)}))
+
+    display_vars = app_vars.make_child()
+    display_vars.add_map({"serial_number": "BENCH", "firmware_version": "1.0"})
+
+    button_vars = display_vars.make_child()
+    button_vars.add_map({"x": 1, "y": 2, "p": 3})
+
+    templates = [
+        "{x} {y}",
+        f"{{var0_0}} / {{var3_{per_map-1}:>12}}",
+        "Static text",
+        "{var1_0}\\n{var2_0!r}",
+    ]
+
+    def legacy():
+        for template in templates:
+            template.format(**button_vars)
+
+    def compiled():
+        button_vars._formatted.clear()
+        for template in templates:
+            button_vars.format(template)
+
+    def cached():
+        for template in templates:
+            button_vars.format(template)
+
+    return {
+        "legacy": measure(legacy, args.duration) * len(templates),
+        "compiled": measure(compiled, args.duration) * len(templates),
+        "cached": measure(cached, args.duration) * len(templates)
+    }
+
+
+def _state_config() -> str:
+    keys = [(x, y) for y in range(4) for x in range(8)]
+    buttons = "".join(f'button {x} {y} {{ text "Key"; bg "#400"; state "on" {{ text "On"; bg "#040"; }} }}\n' for x, y in keys)
+    return f"""
+streamdeck '*' default {{
+    fps 3;
+    brightness 0.5;
+    text "{{x}} {{y}}";
+    bg "#111";
+    size 12;
+    menu "A" default {{
+        fg "#EEE";
+        size 14;
+        {buttons}
+    }}
+}}
+"""
+
+
+def bench_state(args: argparse.Namespace) -> Dict[str, float]:
+    from streamdeckd.application import Streamdeckd
+    from streamdeckd.display import Display, Button, BUTTON_DEFAULTS
+    from streamdeckd.scheduler import Scheduler
+
+    with tempfile.NamedTemporaryFile("w", suffix=".conf", delete=False) as f:
+        f.write(_state_config())
+    try:
+        app = Streamdeckd(f.name, config_cache=False)
+        app.parse_configuration()
+    finally:
+        os.unlink(f.name)
+
+    async def run() -> Dict[str, float]:
+        app.variables = Variables()
+        app.scheduler = Scheduler(asyncio.get_running_loop())
+        for command in app._bootstrap_commands:
+            await command()
+
+        deck_ctx = app.displays[0]
+        disp = Display(app, deck_ctx, VirtualStreamDeck("xl", "bench-state"))
+        await disp.open()
+        menu = disp.current_menu
+        keys = list(disp.buttons.values())
+        plans = [(key, menu.plan_for((key.x, key.y), ""), menu.plan_for((key.x, key.y), "on")) for key in keys]
+        layers = [
+            (BUTTON_DEFAULTS, deck_ctx.state, menu.state, bctx.state, sctx.state)
+            for bctx in menu.buttons.values()
+            for sctx in bctx.states
+        ]
+
+        def read():
+            for key in keys:
+                (key.text, key.bg, key.fg, key.image, key.font, key.size)
+
+        def apply():
+            for key, default, on in plans:
+                key.apply_plan(on)
+                key.apply_plan(default)
+
+        def compile():
+            for layer in layers:
+                compile_plan(Button, *layer)
+
+        results = {
+            "read": measure(read, args.duration) * len(keys) * 6,
+            "apply": measure(apply, args.duration, 10) * len(plans) * 2,
+            "compile": measure(compile, args.duration, 10) * len(layers)
+        }
+
+        await disp.close()
+        app.scheduler.close()
+        return results
+
+    return asyncio.run(run())
+
+
+def bench_draw(args: argparse.Namespace) -> Dict[str, float]:
+    icon = Image.linear_gradient("L").convert("RGBA").resize((64, 64))
+    state = {"text": "Bench 12", "bg": "#123", "fg": "#FFF", "image": icon, "font": "", "size": 10}
+
+    results = {}
+    for kind in DECK_TYPES:
+        fmt = KeyFormat(VirtualStreamDeck(kind, f"bench-{kind}"))
+        drawn = PILHelper.create_image(fmt)
+        draw_key(drawn, state)
+
+        def draw():
+            cache.CACHES["text"].clear()
+            cache.CACHES["resized"].clear()
+            draw_key(PILHelper.create_image(fmt), state)
+
+        def draw_cached():
+            draw_key(PILHelper.create_image(fmt), state)
+
+        def encode():
+            PILHelper.to_native_format(fmt, drawn)
+
+        results[f"{kind}.draw"] = measure(draw, args.duration, 10)
+        results[f"{kind}.cached"] = measure(draw_cached, args.duration, 10)
+        results[f"{kind}.encode"] = measure(encode, args.duration, 10)
+    return results
+
+
+def _menu_config() -> str:
+    keys = [(x, y) for y in range(4) for x in range(8)]
+    menu_a = "".join(f'button {x} {y} {{ text "{{x}},{{y}}"; }}\n' for x, y in keys)
+    menu_b = "".join(f'button {x} {y} {{ text "B {{p}}"; fg "#F80"; }}\n' for x, y in keys)
+    return f"""
+streamdeck '*' default {{
+    menu "A" default {{
+        bg "#102030";
+        {menu_a}
+    }}
+    menu "B" {{
+        {menu_b}
+    }}
+}}
+"""
+
+
+def bench_menu(args: argparse.Namespace) -> Dict[str, float]:
+    from streamdeckd.application import Streamdeckd
+    from streamdeckd.display import Display
+    from streamdeckd.scheduler import Scheduler
+
+    with tempfile.NamedTemporaryFile("w", suffix=".conf", delete=False) as f:
+        f.write(_menu_config())
+    try:
+        app = Streamdeckd(f.name, config_cache=False)
+        app.parse_configuration()
+    finally:
+        os.unlink(f.name)
+
+    async def run() -> Dict[str, float]:
+        app.variables = Variables()
+        app.scheduler = Scheduler(asyncio.get_running_loop())
+        for command in app._bootstrap_commands:
+            await command()
+
+        results = {}
+        for kind in DECK_TYPES:
+            disp = Display(app, app.displays[0], VirtualStreamDeck(kind, f"bench-{kind}"))
+            await disp.open()
+            menus = itertools.cycle(["B", "A"])
+
+            def switch():
+                disp.menu = next(menus)
+
+            results[f"{kind}.switch"] = measure(switch, args.duration, 2)
+
+            cache, app.frame_cache = app.frame_cache, None
+            results[f"{kind}.uncached"] = measure(switch, args.duration, 2)
+            app.frame_cache = cache
+            await disp.close()
+
+        app.scheduler.close()
+        return results
+
+    return asyncio.run(run())
+
+
+def bench_scheduler(args: argparse.Namespace) -> Dict[str, float]:
+    from streamdeckd.scheduler import Scheduler
+
+    async def noop():
+        pass
+
+    async def run() -> Dict[str, float]:
+        scheduler = Scheduler(asyncio.get_running_loop())
+        periods = [0.01, 0.02, 0.05, 0.1]
+        for i in range(args.jobs):
+            scheduler.add_recurring(periods[i % len(periods)], noop)
+
+        start = time.process_time()
+        await asyncio.sleep(args.duration)
+        cpu = time.process_time() - start
+
+        runs = scheduler.stats()["runs"]
+        scheduler.close()
+        return {"dispatch": runs / max(cpu, 1e-9)}
+
+    return asyncio.run(run())
+
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], Dict[str, float]]] = {
+    "templates": bench_templates,
+    "state": bench_state,
+    "draw": bench_draw,
+    "menu": bench_menu,
+    "scheduler": bench_scheduler
+}
+
+
+def compare(baseline: Dict[str, Any], results: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'benchmark':<12} {'variant':<18} {'baseline':>14} {'current':>14} {'change':>8}")
+    for name, variants in results.items():
+        for variant, calls in variants.items():
+            before = baseline["results"].get(name, {}).get(variant, None)
+            if before is None:
+                print(f"{name:<12} {variant:<18} {'-':>14} {calls:>14,.0f} {'new':>8}")
+                continue
+            print(f"{name:<12} {variant:<18} {before:>14,.0f} {calls:>14,.0f} {(calls / before - 1) * 100:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run micro-benchmarks of the streamdeck daemon.")
+    parser.add_argument("benchmarks", nargs="*", default=list(BENCHMARKS.keys()), help="The benchmarks to run.")
+    parser.add_argument("--duration", "-d", type=float, default=1.0, help="Seconds to run each variant.")
+    parser.add_argument("--variables", type=int, default=400, help="Number of variables in scope for the template benchmark.")
+    parser.add_argument("--jobs", type=int, default=200, help="Number of recurring jobs for the scheduler benchmark.")
+    parser.add_argument("--json", help="Write the results to this file.")
+    parser.add_argument("--compare", help="Compare the results against a file written by --json.")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name in args.benchmarks:
+        results[name] = BENCHMARKS[name](args)
+        if args.compare is None:
+            for variant, calls in results[name].items():
+                print(f"{name:<12} {variant:<18} {calls:>14,.0f} calls/s")
+
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), results)
+
+    if args.json is not None:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "duration": args.duration,
+                "results": results
+            }, f, indent=2)
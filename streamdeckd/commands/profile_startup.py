@@ -0,0 +1,78 @@
+import os
+import re
+import sys
+import json
+import asyncio
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$")
+
+
+def boot(config: str, use_cache: bool) -> Dict[str, float]:
+    from streamdeckd.application import Streamdeckd
+    app = Streamdeckd(config, config_cache=use_cache)
+    app.parse_configuration()
+
+    async def _run():
+        try:
+            await app.run()
+        finally:
+            await app.end()
+
+    asyncio.get_event_loop().run_until_complete(_run())
+    return app.phases
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    modules = []
+    for line in output.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        modules.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and boot times of the streamdeck daemon.")
+    parser.add_argument('--config', '-f', help="The configuration file to load.", default=os.environ.get("STREAMDECKD_CONFIG_PATH", None))
+    parser.add_argument('--no-cache', action="store_true", help="Do not use the compiled configuration cache.")
+    parser.add_argument('--top', type=int, default=15, help="Number of modules to list.")
+    parser.add_argument('--child', action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(boot(args.config, not args.no_cache)))
+        return
+
+    command = [sys.executable, "-X", "importtime", "-m", "streamdeckd.commands.profile_startup", "--child"]
+    if args.config is not None:
+        command += ["--config", args.config]
+    if args.no_cache:
+        command.append("--no-cache")
+
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stdout, end="")
+        print("\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:")), file=sys.stderr)
+        sys.exit(result.returncode)
+
+    modules = parse_importtime(result.stderr)
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+
+    print(f"{'module':<48} {'self':>10} {'cumulative':>12}")
+    for name, own, cumulative in sorted(modules, key=lambda m: m[2], reverse=True)[:args.top]:
+        print(f"{name:<48} {own/1000:>8.1f}ms {cumulative/1000:>10.1f}ms")
+
+    print()
+    print(f"{'phase':<48} {'time':>10}")
+    print(f"{'imports':<48} {sum(m[1] for m in modules)/1000:>8.1f}ms")
+    for phase, duration in phases.items():
+        print(f"{phase:<48} {duration*1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import time
+import asyncio
+import argparse
+import logging
+from typing import Any, Dict, List
+
+from streamdeckd.application import Streamdeckd
+from streamdeckd.devices import DeviceSourceDispatch
+from streamdeckd.recorder import Recorder, read_log
+from streamdeckd.virtual import DECK_TYPES, VirtualDeviceSource
+from streamdeckd.commands.simulate import percentile, latencies
+
+
+def deck_kind(deck_type: str, image_format: str, rows: int, cols: int) -> str:
+    for kind, spec in DECK_TYPES.items():
+        if spec["deck_type"] == deck_type and spec["format"] == image_format:
+            return kind
+    for kind, spec in DECK_TYPES.items():
+        if spec["layout"] == (rows, cols):
+            return kind
+    return "original"
+
+
+async def replay(args: argparse.Namespace) -> Dict[str, Any]:
+    entries = list(read_log(args.log))
+
+    sources: Dict[str, VirtualDeviceSource] = {}
+    for _, kind, *data in entries:
+        if kind != "deck":
+            continue
+        identifier, serial, deck_type, image_format, rows, cols = data
+        source = sources.setdefault(identifier.split("/", 1)[0], VirtualDeviceSource())
+        source.add(deck_kind(deck_type, image_format, rows, cols), serial)
+    decks = {serial: deck for source in sources.values() for serial, deck in source.decks.items()}
+
+    app = Streamdeckd(args.config, config_cache=not args.no_cache, source=DeviceSourceDispatch(**sources))
+    app.recorder = Recorder(args.record or os.devnull)
+    app.hermetic = True
+    exits: List[float] = []
+    app.exit_handler = lambda: exits.append(time.perf_counter())
+    app.parse_configuration()
+    await app.run()
+
+    recorded: Dict[str, int] = {}
+    missing = 0
+    try:
+        loop = asyncio.get_running_loop()
+        renders_before = sum(disp.renders for disp in app._controlled_devices.values())
+        signals_before = app.recorder.counts.get("signal", 0)
+        for deck in decks.values():
+            deck.clear_records()
+
+        cpu = time.process_time()
+        start = loop.time()
+        for timestamp, kind, *data in entries:
+            recorded[kind] = recorded.get(kind, 0) + 1
+            if args.speed > 0:
+                delay = start + timestamp / args.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            if kind == "key":
+                serial, key, pressed = data
+                if serial in decks:
+                    decks[serial].press(key, bool(pressed))
+                else:
+                    missing += 1
+            elif kind == "var":
+                name, key, value = data
+                if name in app.variable_maps:
+                    app.variable_maps[name][key] = value
+                else:
+                    missing += 1
+
+        await asyncio.sleep(args.settle)
+        elapsed = loop.time() - start
+        cpu = time.process_time() - cpu
+        renders = sum(disp.renders for disp in app._controlled_devices.values()) - renders_before
+        signals = app.recorder.counts.get("signal", 0) - signals_before
+    finally:
+        await app.end()
+
+    answered = [latency for deck in decks.values() for latency in latencies(deck, args.window)]
+    return {
+        "decks": len(decks),
+        "keys": recorded.get("key", 0),
+        "vars": recorded.get("var", 0),
+        "missing": missing,
+        "signals_recorded": recorded.get("signal", 0),
+        "signals_replayed": signals,
+        "latency_p50": percentile(answered, 0.5),
+        "latency_p99": percentile(answered, 0.99),
+        "renders": renders,
+        "writes": sum(len(deck.key_writes) for deck in decks.values()),
+        "bytes": sum(deck.bytes_written() for deck in decks.values()),
+        "elapsed": elapsed,
+        "cpu_time": cpu,
+        "exits": len(exits)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a log written by 'streamdeckd run --record' against virtual decks.")
+    parser.add_argument('log', help="The recorded log.")
+    parser.add_argument('--config', '-f', help="The configuration file to load.", default=os.environ.get("STREAMDECKD_CONFIG_PATH", None))
+    parser.add_argument('--no-cache', action="store_true", help="Do not use the compiled configuration cache.")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed factor, 0 replays as fast as possible.")
+    parser.add_argument('--settle', type=float, default=0.5, help="Seconds to wait after the last event.")
+    parser.add_argument('--window', type=float, default=1.0, help="Longest delay between a key event and a key write counted as its response.")
+    parser.add_argument('--record', help="Record the replayed run into this file.")
+    parser.add_argument('--verbose', '-v', action="store_true", help="Show the daemon log.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    result = asyncio.run(replay(args))
+
+    print(f"decks              {result['decks']:>10}")
+    print(f"key events         {result['keys']:>10}")
+    print(f"variable writes    {result['vars']:>10}")
+    print(f"skipped events     {result['missing']:>10}")
+    print(f"signals            {result['signals_replayed']:>10} (recorded {result['signals_recorded']})")
+    print(f"latency p50/p99    {result['latency_p50']*1000:>8.1f}ms {result['latency_p99']*1000:.1f}ms")
+    print(f"renders            {result['renders']:>10}")
+    print(f"key writes         {result['writes']:>10} ({result['bytes']:,} bytes)")
+    print(f"elapsed            {result['elapsed']:>9.2f}s (cpu {result['cpu_time']:.2f}s)")
+    if result["exits"]:
+        print(f"exit requests      {result['exits']:>10} (ignored)")
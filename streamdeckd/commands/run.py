@@ -2,11 +2,17 @@ import os
 import sys
 import argparse
 from streamdeckd.application import Streamdeckd
+from streamdeckd.recorder import Recorder
 
 
 def main():
     parser = argparse.ArgumentParser(description="Run the streamdeck daemon.")
     parser.add_argument('--config', '-f', help="The configuration file to load.", default=os.environ.get("STREAMDECKD_CONFIG_PATH", None))
+    parser.add_argument('--no-cache', action="store_true", help="Do not use or update the compiled configuration cache.")
+    parser.add_argument('--record', help="Record key events, variable writes and signals into this file for 'streamdeckd replay'.")
     args = parser.parse_args()
 
-    sys.exit(Streamdeckd(args.config).start())
\ No newline at end of file
+    app = Streamdeckd(args.config, config_cache=not args.no_cache)
+    if args.record is not None:
+        app.recorder = Recorder(args.record)
+    sys.exit(app.start())
\ No newline at end of file
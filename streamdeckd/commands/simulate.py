@@ -0,0 +1,140 @@
+import os
+import math
+import time
+import random
+import asyncio
+import argparse
+import logging
+from bisect import bisect_left
+from typing import Dict, List, Sequence
+
+from streamdeckd.application import Streamdeckd
+from streamdeckd.devices import DeviceSourceDispatch
+from streamdeckd.virtual import DECK_TYPES, VirtualDeviceSource, VirtualStreamDeck
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(math.ceil(len(values) * q) - 1, 0)]
+
+
+def latencies(deck: VirtualStreamDeck, window: float) -> List[float]:
+    writes: Dict[int, List[float]] = {}
+    for ts, key, _ in deck.key_writes:
+        writes.setdefault(key, []).append(ts)
+
+    result = []
+    for ts, key, _ in deck.presses:
+        times = writes.get(key, [])
+        idx = bisect_left(times, ts)
+        if idx < len(times) and times[idx] - ts <= window:
+            result.append(times[idx] - ts)
+    return result
+
+
+async def measure_lag(interval: float, lags: List[float]) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(loop.time() - expected, 0.0))
+
+
+async def press_keys(decks: List[VirtualStreamDeck], rate: float, hold: float, rng: random.Random) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(rng.expovariate(rate))
+        deck = rng.choice(decks)
+        key = rng.randrange(deck.key_count())
+        deck.press(key, True)
+        loop.call_later(hold, deck.press, key, False)
+
+
+async def simulate(args: argparse.Namespace) -> Dict[str, float]:
+    virtual = VirtualDeviceSource()
+    decks = [virtual.add(args.type, f"sim{i}") for i in range(args.decks)]
+
+    app = Streamdeckd(args.config, config_cache=not args.no_cache, source=DeviceSourceDispatch(virtual=virtual))
+    exits: List[float] = []
+    app.exit_handler = lambda: exits.append(time.perf_counter())
+    app.parse_configuration()
+    await app.run()
+
+    try:
+        await asyncio.sleep(args.warmup)
+
+        for deck in decks:
+            deck.clear_records()
+        renders_before = sum(disp.renders for disp in app._controlled_devices.values())
+
+        lags: List[float] = []
+        rng = random.Random(args.seed)
+        tasks = [
+            asyncio.get_running_loop().create_task(measure_lag(0.01, lags)),
+            asyncio.get_running_loop().create_task(press_keys(decks, args.presses_per_sec, args.hold, rng))
+        ]
+
+        cpu = time.process_time()
+        start = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+
+        for task in tasks:
+            task.cancel()
+        controlled = len(app._controlled_devices)
+        renders = sum(disp.renders for disp in app._controlled_devices.values()) - renders_before
+    finally:
+        await app.end()
+
+    answered = [latency for deck in decks for latency in latencies(deck, args.window)]
+    return {
+        "decks": controlled,
+        "events": sum(len(deck.presses) for deck in decks),
+        "answered": len(answered),
+        "latency_p50": percentile(answered, 0.5),
+        "latency_p95": percentile(answered, 0.95),
+        "latency_p99": percentile(answered, 0.99),
+        "latency_max": max(answered, default=0.0),
+        "renders_per_sec": renders / elapsed,
+        "writes_per_sec": sum(len(deck.key_writes) for deck in decks) / elapsed,
+        "bytes_per_sec": sum(deck.bytes_written() for deck in decks) / elapsed,
+        "loop_lag_p50": percentile(lags, 0.5),
+        "loop_lag_p99": percentile(lags, 0.99),
+        "loop_lag_max": max(lags, default=0.0),
+        "cpu_time": cpu,
+        "cpu_percent": cpu / elapsed * 100,
+        "exits": len(exits)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a configuration against virtual decks with synthetic key presses.")
+    parser.add_argument('--config', '-f', help="The configuration file to load.", default=os.environ.get("STREAMDECKD_CONFIG_PATH", None))
+    parser.add_argument('--no-cache', action="store_true", help="Do not use the compiled configuration cache.")
+    parser.add_argument('--decks', type=int, default=1, help="Number of virtual decks.")
+    parser.add_argument('--type', choices=list(DECK_TYPES.keys()), default="original", help="The emulated deck type.")
+    parser.add_argument('--presses-per-sec', type=float, default=5.0, help="Key presses per second across all decks.")
+    parser.add_argument('--hold', type=float, default=0.05, help="Seconds a key is held down.")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to simulate.")
+    parser.add_argument('--warmup', type=float, default=1.0, help="Seconds to wait after booting before measuring.")
+    parser.add_argument('--window', type=float, default=1.0, help="Longest delay between a press and a key write counted as its response.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the press generator.")
+    parser.add_argument('--verbose', '-v', action="store_true", help="Show the daemon log.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    result = asyncio.run(simulate(args))
+
+    print(f"decks              {result['decks']:>10}")
+    print(f"key events         {result['events']:>10} ({result['answered']} answered by a key write)")
+    print(f"latency p50/p95/p99 {result['latency_p50']*1000:>8.1f}ms {result['latency_p95']*1000:.1f}ms {result['latency_p99']*1000:.1f}ms (max {result['latency_max']*1000:.1f}ms)")
+    print(f"renders            {result['renders_per_sec']:>10.1f}/s")
+    print(f"key writes         {result['writes_per_sec']:>10.1f}/s")
+    print(f"usb bytes          {result['bytes_per_sec']:>10,.0f}/s")
+    print(f"loop lag p50/p99   {result['loop_lag_p50']*1000:>8.1f}ms {result['loop_lag_p99']*1000:.1f}ms (max {result['loop_lag_max']*1000:.1f}ms)")
+    print(f"cpu time           {result['cpu_time']:>9.2f}s ({result['cpu_percent']:.0f}%)")
+    if result["exits"]:
+        print(f"exit requests      {result['exits']:>10} (ignored)")
@@ -1,6 +1,7 @@
 import asyncio
 from typing import Type, ClassVar, List, Callable, Awaitable
 
+from streamdeckd import extensions
 from streamdeckd.state import State
 from streamdeckd.application import Streamdeckd
 
@@ -23,13 +24,15 @@ class ActionContext(ActionableContext):
 
     @classmethod
     def register(cls, atc: Type[ActionableContext]):
-        cls.SUPPORTED.append(atc)
+        if atc not in cls.SUPPORTED:
+            cls.SUPPORTED.append(atc)
         return atc
 
     def __init__(self):
         self.actions: List[ActionableContext] = []
 
     def unknown_directive(self, name, args, block):
+        extensions.resolve("actions", name)
         for ctx_cls in self.SUPPORTED:
             if hasattr(ctx_cls, f"on_{name}"):
                 break
@@ -1,12 +1,18 @@
 import os
+import time
 import logging
 import asyncio
 import importlib
 from datetime import timedelta
-from typing import Sequence, Callable, Optional, Any
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Sequence, Callable, Optional, Any, Dict, Tuple
 
-from streamdeckd.utils import load, parse_timespan
-from streamdeckd.application import Streamdeckd
+from streamdeckd import cache, extensions
+from streamdeckd.cache import LRUCache
+from streamdeckd.animation import frame_size
+from streamdeckd.devices import HotplugDeviceSource, NetlinkEventSource
+from streamdeckd.utils import load, parse_timespan, parse_size
+from streamdeckd.application import Streamdeckd, FRAME_CACHE_SIZE
 
 from streamdeckd.config.base import Context
 from streamdeckd.config.validators import validated, validate
@@ -17,6 +23,8 @@ class EventLoopContext(Context):
     def __init__(self):
         self.loop = None
         self.policy = None
+        self.render_pool = None
+        self.render_workers = None
 
     @validated(min_args=1, max_args=1, with_block=False)
     def on_loop(self, args: Sequence[str], block: Sequence[dict]):
@@ -28,6 +36,21 @@ class EventLoopContext(Context):
         factory: Callable[[], asyncio.AbstractEventLoopPolicy] = load(args[0])
         self.policy = factory
 
+    @validated(min_args=1, max_args=2, with_block=False)
+    def on_render_pool(self, args: Sequence[str], block: None):
+        if args[0] not in {"inline", "thread", "process"}:
+            raise ValueError(f"render_pool: Unknown pool type '{args[0]}'")
+        self.render_pool = args[0]
+        if len(args) == 2:
+            self.render_workers = int(args[1])
+
+    def create_render_pool(self) -> Optional[Executor]:
+        if self.render_pool == "thread":
+            return ThreadPoolExecutor(self.render_workers, thread_name_prefix="streamdeckd-render")
+        elif self.render_pool == "process":
+            return ProcessPoolExecutor(self.render_workers)
+        return None
+
     def prepare(self):
         if self.policy is not None:
             asyncio.set_event_loop_policy(self.policy())
@@ -60,6 +83,7 @@ class ApplicationContext(Context):
     def __init__(self, app: Streamdeckd):
         self.app = app
         self.rescan: Optional[timedelta] = None
+        self.hotplug = False
         self.evctx = EventLoopContext()
 
         self.prepare_list = {
@@ -67,7 +91,13 @@ class ApplicationContext(Context):
         }
 
         self._loaded_modules = set()
+        self._deferred: Dict[str, extensions.Manifest] = {}
         self.modules = []
+        self.displays = []
+
+        self.rescan_job: Optional[int] = None
+        self.cache_budgets: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+        self.frame_cache_budget = FRAME_CACHE_SIZE
 
     @validated(min_args=0, max_args=0, with_block=True)
     def on_eventloop(self, args: Sequence[str], block: Sequence[dict]):
@@ -81,18 +111,73 @@ class ApplicationContext(Context):
 
     @validated(min_args=1, max_args=1, with_block=False)
     def on_rescan(self, args: Sequence[str], block: None):
-        self.rescan = parse_timespan(args[0])
+        if args[0] == "hotplug":
+            self.hotplug = True
+            self.rescan = None
+        else:
+            self.hotplug = False
+            self.rescan = parse_timespan(args[0])
+
+    @validated(min_args=1, max_args=1, with_block=False)
+    def on_frame_cache(self, args: Sequence[str], block: None):
+        self.frame_cache_budget = parse_size(args[0])
+
+    @validated(min_args=2, max_args=3, with_block=False)
+    def on_cache(self, args: Sequence[str], block: None):
+        if args[0] == "frames" and len(args) == 2:
+            return self.on_frame_cache(args[1:], None)
+        if args[0] != "frames" and args[0] not in cache.CACHES:
+            raise ValueError(f"cache: Unknown cache '{args[0]}'")
+
+        max_bytes, max_entries = self.cache_budgets.get(args[0], (None, None))
+        if len(args) == 3:
+            if args[1] != "entries":
+                raise ValueError("cache: Argument 2 must be 'entries'")
+            max_entries = int(args[2])
+        else:
+            max_bytes = parse_size(args[1])
+        self.cache_budgets[args[0]] = (max_bytes, max_entries)
 
     @validated(min_args=1, max_args=1, with_block=False)
     def on_load(self, args: Sequence[str], block: None):
-        if args[0] in self._loaded_modules:
+        if args[0] in self._loaded_modules or args[0] in self._deferred:
+            return
+
+        manifest = extensions.manifest(args[0])
+        if manifest is not None and not manifest.eager:
+            self._deferred[args[0]] = manifest
             return
 
-        module: Any = importlib.import_module("streamdeckd_ext." + args[0])
+        self.load_module(args[0])
+
+    def load_module(self, name: str):
+        start = time.perf_counter()
+        module: Any = importlib.import_module("streamdeckd_ext." + name)
         self.modules.append(module)
 
         module.load(self.app, self)
-        self._loaded_modules.add(args[0])
+        self._loaded_modules.add(name)
+        self.app.phases[f"load.{name}"] = time.perf_counter() - start
+
+    def load_deferred(self, kind: str, name: str) -> bool:
+        for module, manifest in self._deferred.items():
+            if manifest.provides(kind, name):
+                break
+        else:
+            return False
+
+        del self._deferred[module]
+        self.load_module(module)
+        return True
+
+    def apply_block(self, block: Sequence[dict]):
+        with extensions.loading(self):
+            super().apply_block(block)
+
+    def unknown_directive(self, name: str, args: Sequence[str], block: Sequence[dict]):
+        if extensions.resolve("directives", name):
+            return self.apply_directive(name, args, block)
+        return super().unknown_directive(name, args, block)
 
     if hasattr(os, "getreuid") and os.geteuid() == 0:
         @validated(min_args=1, max_args=1, with_block=False)
@@ -137,7 +222,8 @@ class ApplicationContext(Context):
         from streamdeckd.config.streamdeck import StreamdeckContext
         ctx = StreamdeckContext(self.app, args[0], default=default)
         ctx.apply_block(block)
-        self.app.displays.append(ctx)
+        ctx.compile_plans()
+        self.displays.append(ctx)
 
     def prepare(self):
         for stage in sorted(self.prepare_list.keys()):
@@ -150,6 +236,51 @@ class ApplicationContext(Context):
     async def when_leaving(self, app, target):
         pass
 
+    def configure_caches(self):
+        budget = self.frame_cache_budget
+        if budget:
+            if self.app.frame_cache is None or self.app.frame_cache.max_bytes != budget:
+                self.app.frame_cache = cache.register("frames", LRUCache(budget, sizeof=frame_size))
+        else:
+            self.app.frame_cache = None
+            cache.unregister("frames")
+        cache.configure(self.cache_budgets)
+
     async def apply(self):
+        self.configure_caches()
+        self.app.render_pool = self.evctx.create_render_pool()
+        if self.hotplug:
+            self.watch_devices()
+        if self.rescan:
+            self.rescan_job = self.app.scheduler.add_recurring(self.rescan, self.app.perform_rescan, name="rescan")
+
+    def watch_devices(self):
+        loop = asyncio.get_running_loop()
+        scanner = HotplugDeviceSource(self.app.scanner, NetlinkEventSource())
+        try:
+            scanner.start(loop, lambda: loop.create_task(self.app.perform_rescan()))
+        except OSError as e:
+            self.app.logger.warning(f"Cannot listen for device events, falling back to rescanning every 10s: {e!r}")
+            self.rescan = timedelta(seconds=10)
+            return
+
+        self.app.scanner = scanner
+        self.app.stats["hotplug"] = scanner.stats
+
+    async def reload(self, previous: 'ApplicationContext'):
+        if (self.evctx.render_pool, self.evctx.render_workers) != (previous.evctx.render_pool, previous.evctx.render_workers):
+            self.app.logger.warning("Changes to the render pool take effect after a restart.")
+        if self.hotplug != previous.hotplug:
+            self.app.logger.warning("Switching between hotplug and periodic rescans takes effect after a restart.")
+            self.hotplug = previous.hotplug
+            self.rescan = previous.rescan
+
+        self.rescan_job = previous.rescan_job
+        if self.rescan == previous.rescan:
+            return
+
+        if self.rescan_job is not None:
+            self.app.scheduler.remove_recurring(self.rescan_job)
+            self.rescan_job = None
         if self.rescan:
-            self.app.scheduler.add_recurring(self.rescan, self.app.perform_rescan)
\ No newline at end of file
+            self.rescan_job = self.app.scheduler.add_recurring(self.rescan, self.app.perform_rescan, name="rescan")
\ No newline at end of file
@@ -0,0 +1,150 @@
+import os
+import glob
+import json
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import crossplane
+
+
+CACHE_VERSION = 1
+
+
+def cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME", None) or os.path.expanduser("~/.cache")
+    return os.path.join(base, "streamdeckd")
+
+
+def _cache_path(config_file: str) -> str:
+    name = hashlib.sha1(os.path.abspath(config_file).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir(), f"config-{name}.json")
+
+
+def _hash_file(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _include_patterns(config_file: str, block: List[Dict[str, Any]]) -> List[str]:
+    config_dir = os.path.dirname(config_file)
+    patterns = []
+    for stmt in block:
+        if stmt["directive"] == "include" and stmt.get("args"):
+            pattern = stmt["args"][0]
+            if not os.path.isabs(pattern):
+                pattern = os.path.join(config_dir, pattern)
+            patterns.append(pattern)
+        if "block" in stmt:
+            patterns.extend(_include_patterns(config_file, stmt["block"]))
+    return patterns
+
+
+def _tag_file(block: List[Dict[str, Any]], file: str) -> None:
+    for stmt in block:
+        stmt["file"] = file
+        if "block" in stmt:
+            _tag_file(stmt["block"], file)
+
+
+def _inline_includes(configs: List[Dict[str, Any]], block: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    result = []
+    for stmt in block:
+        if stmt["directive"] == "include":
+            for index in stmt.get("includes", ()):
+                result.extend(_inline_includes(configs, configs[index]["parsed"]))
+            continue
+        if "block" in stmt:
+            stmt = {**stmt, "block": _inline_includes(configs, stmt["block"])}
+        result.append(stmt)
+    return result
+
+
+def _combine(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    main = parsed["config"][0]
+    return {
+        "status": "ok",
+        "errors": [],
+        "config": [{
+            "file": main["file"],
+            "status": "ok",
+            "errors": [],
+            "parsed": _inline_includes(parsed["config"], main["parsed"])
+        }]
+    }
+
+
+def _dependencies(config_file: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    patterns = []
+    for config in payload["config"]:
+        patterns.extend(_include_patterns(config_file, config["parsed"]))
+
+    return {
+        "files": {config["file"]: _hash_file(config["file"]) for config in payload["config"]},
+        "includes": {pattern: sorted(glob.glob(pattern)) for pattern in patterns}
+    }
+
+
+def _is_fresh(entry: Dict[str, Any]) -> bool:
+    if entry.get("version") != CACHE_VERSION or entry.get("crossplane") != crossplane.__version__:
+        return False
+
+    for path, digest in entry["files"].items():
+        if digest is None or _hash_file(path) != digest:
+            return False
+    for pattern, matches in entry["includes"].items():
+        if sorted(glob.glob(pattern)) != matches:
+            return False
+    return True
+
+
+def load(config_file: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_cache_path(config_file), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not _is_fresh(entry):
+        return None
+    return entry["payload"]
+
+
+def store(config_file: str, payload: Dict[str, Any], dependencies: Dict[str, Any]) -> None:
+    path = _cache_path(config_file)
+    entry = {
+        "version": CACHE_VERSION,
+        "crossplane": crossplane.__version__,
+        **dependencies,
+        "payload": payload
+    }
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def parse(config_file: str, use_cache: bool=True) -> Tuple[Dict[str, Any], bool]:
+    if use_cache:
+        payload = load(config_file)
+        if payload is not None:
+            return payload, True
+
+    parsed = crossplane.parse(config_file)
+    if parsed["status"] != "ok":
+        return parsed, False
+
+    dependencies = _dependencies(config_file, parsed)
+    for config in parsed["config"]:
+        _tag_file(config["parsed"], config["file"])
+    payload = _combine(parsed)
+    if use_cache:
+        store(config_file, payload, dependencies)
+    return payload, False
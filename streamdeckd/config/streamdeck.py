@@ -1,9 +1,10 @@
-from typing import List, Optional, Tuple, Dict, cast
+from typing import List, Optional, Tuple, Dict, Set, Any, Sequence, Type, cast
 from StreamDeck.Devices.StreamDeck import StreamDeck
 
 from streamdeckd.application import Streamdeckd
 from streamdeckd.devices import DeviceSource
 from streamdeckd.signals import create as create_signal
+from streamdeckd.state import Plan, compile_plan
 
 from streamdeckd.config.base import Context
 from streamdeckd.config.validators import validated
@@ -73,6 +74,14 @@ class ButtonActionContext(ActionContext):
             await target.when_key_released(force=True)
 
 
+def _signal_callback(app, target, signal, ctx):
+    def _fired():
+        if app.recorder is not None:
+            app.recorder.signal(signal.label)
+        return ctx.apply_actions(app, target)
+    return _fired
+
+
 class SignalContext:
 
     def __init__(self, *args, **kwargs):
@@ -90,6 +99,23 @@ class SignalContext:
 
         self.signals.append((signal, ctx, [None]))
 
+    def attach(self, app, target):
+        for signal, sig_ctx, cb_holder in self.signals:
+            if cb_holder[0] is not None:
+                continue
+
+            cb = _signal_callback(app, target, signal, sig_ctx)
+            cb_holder[0] = cb
+            signal.register(cb)
+
+    def detach(self, app, target):
+        for signal, sig_ctx, cb_holder in self.signals:
+            if cb_holder[0] is None:
+                continue
+
+            signal.unregister(cb_holder[0])
+            cb_holder[0] = None
+
 
 class StateDefinition(SignalContext, BaseButtonDefinition):
     
@@ -99,6 +125,7 @@ class StateDefinition(SignalContext, BaseButtonDefinition):
         self.default = default
         self.entered = None
         self.leaving = None
+        self.plan: Plan = ()
 
     @validated(min_args=0, max_args=0, with_block=True)
     def on_entered(self, args, block):
@@ -113,22 +140,12 @@ class StateDefinition(SignalContext, BaseButtonDefinition):
     async def when_entered(self, app, target):
         if self.entered is not None:
             await self.entered.apply_actions(app, target)
-
-        for signal, sig_ctx, cb_holder in self.signals:
-            if cb_holder[0] is not None:
-                continue
-
-            cb = (lambda ctx: (lambda: ctx.apply_actions(app, target)))(sig_ctx)
-            cb_holder[0] = cb
-            signal.register(cb)
+        self.attach(app, target)
 
     async def when_leaving(self, app, target):
         if self.leaving is not None:
             await self.leaving.apply_actions(app, target)
-
-        for signal, sig_ctx, cb_holder in self.signals:
-            signal.unregister(cb_holder[0])
-            cb_holder[0] = None
+        self.detach(app, target)
 
 
 class ButtonDefinition(BaseButtonDefinition):
@@ -138,6 +155,8 @@ class ButtonDefinition(BaseButtonDefinition):
         self.y = y
 
         self.states: List[StateDefinition] = []
+        self.state_index: Dict[str, StateDefinition] = {}
+        self.default_state = StateDefinition('', True)
 
     @validated(min_args=1, max_args=2, with_block=True)
     def on_state(self, args, block):
@@ -151,16 +170,18 @@ class ButtonDefinition(BaseButtonDefinition):
         sctx.apply_block(block)
         self.states.append(sctx)
 
-    def get_state(self, name: Optional[bool]) -> StateDefinition:
-        if name is not None:
-            for ctx in self.states:
-                if ctx.name == name:
-                    return ctx
-        for ctx in self.states:
-            if ctx.default:
-                return ctx
+        self.state_index.setdefault(sctx.name, sctx)
+        if default and self.default_state not in self.states:
+            self.default_state = sctx
+
+    def get_state(self, name: Optional[str]) -> StateDefinition:
+        if name is not None and name in self.state_index:
+            return self.state_index[name]
+        return self.default_state
 
-        return StateDefinition('', True)
+    def compile_plans(self, cls: Type[State], layers: Sequence[Dict[str, Any]]):
+        for sctx in {id(sctx): sctx for sctx in [*self.states, self.default_state]}.values():
+            sctx.plan = compile_plan(cls, *layers, self.state, sctx.state)
 
 
 class MenuContext(DeckContext, ButtonContext):
@@ -170,9 +191,10 @@ class MenuContext(DeckContext, ButtonContext):
         self.identifier = identifier
         self.default = default
 
-        self.buttons: Dict[Tuple[int, int], ButtonContext] = {}
+        self.buttons: Dict[Tuple[int, int], ButtonDefinition] = {}
         self.opened = None
         self.closed = None
+        self.plan: Plan = ()
 
     @validated(min_args=2, max_args=2, with_block=True)
     def on_button(self, args, block):
@@ -196,6 +218,17 @@ class MenuContext(DeckContext, ButtonContext):
         ctx.apply_block(block)
         self.closed = ctx
 
+    def plan_for(self, loc: Tuple[int, int], state: Optional[str]) -> Plan:
+        bctx = self.buttons.get(loc, None)
+        if bctx is None:
+            return self.plan
+        return bctx.get_state(state).plan
+
+    def compile_plans(self, cls: Type[State], layers: Sequence[Dict[str, Any]]):
+        layers = [*layers, self.state]
+        self.plan = compile_plan(cls, *layers)
+        for bctx in self.buttons.values():
+            bctx.compile_plans(cls, layers)
 
 
 class StreamdeckContext(SignalContext, DeckContext, ButtonContext):
@@ -207,19 +240,35 @@ class StreamdeckContext(SignalContext, DeckContext, ButtonContext):
 
         self.default = default
         self.menus: List[MenuContext] = []
+        self.menu_index: Dict[str, MenuContext] = {}
+        self.default_menu = MenuContext('', True)
 
         self.connected = None
+        self.plan: Plan = ()
 
     def get_menu(self, name: Optional[str]) -> MenuContext:
-        if name is not None:
-            for ctx in self.menus:
-                if ctx.identifier == name:
-                    return ctx
-        for ctx in self.menus:
-            if ctx.default:
-                return ctx
-
-        return MenuContext('', True)
+        if name is not None and name in self.menu_index:
+            return self.menu_index[name]
+        return self.default_menu
+
+    def compile_plans(self):
+        from streamdeckd.display import Display, Button, BUTTON_DEFAULTS
+        self.plan = compile_plan(Display, self.state)
+        for menu in {id(menu): menu for menu in [*self.menus, self.default_menu]}.values():
+            menu.compile_plans(Button, [BUTTON_DEFAULTS, self.state])
+
+    def fonts(self) -> Set[Tuple[str, int]]:
+        plans = []
+        for menu in {id(menu): menu for menu in [*self.menus, self.default_menu]}.values():
+            plans.append(menu.plan)
+            for bctx in menu.buttons.values():
+                plans.extend(sctx.plan for sctx in [*bctx.states, bctx.default_state])
+
+        result = set()
+        for plan in plans:
+            values = {variable.name: value for variable, value in plan}
+            result.add((values.get("font", ""), values.get("size", 10)))
+        return result
 
     @validated(min_args=1, max_args=2, with_block=True)
     def on_menu(self, args, block):
@@ -233,6 +282,10 @@ class StreamdeckContext(SignalContext, DeckContext, ButtonContext):
         ctx.apply_block(block)
         self.menus.append(ctx)
 
+        self.menu_index.setdefault(ctx.identifier, ctx)
+        if default and self.default_menu not in self.menus:
+            self.default_menu = ctx
+
     @validated(min_args=0, max_args=0, with_block=True)
     def on_connected(self, args, block):
         ctx = SequentialActionContext()
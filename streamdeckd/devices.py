@@ -1,8 +1,37 @@
-from typing import Union, Optional, Sequence, List, Dict
+import socket
+import struct
+import logging
+from asyncio import AbstractEventLoop, Handle
+from typing import Union, Optional, Sequence, List, Dict, Callable, Any, Tuple
 from StreamDeck.DeviceManager import DeviceManager
 from StreamDeck.Devices.StreamDeck import StreamDeck
 
 
+def device_id(deck: StreamDeck) -> str:
+    ident = deck.id()
+    if isinstance(ident, bytes):
+        return ident.decode("ascii")
+    return ident
+
+
+class DeviceInfo(object):
+
+    def __init__(self, path: str, serial: str, firmware: str, deck_type: str, layout: Tuple[int, int]):
+        self.path = path
+        self.serial = serial
+        self.firmware = firmware
+        self.deck_type = deck_type
+        self.layout = layout
+
+    @classmethod
+    def probe(cls, deck: StreamDeck) -> 'DeviceInfo':
+        deck.open()
+        try:
+            return cls(device_id(deck), deck.get_serial_number(), deck.get_firmware_version(), deck.deck_type(), tuple(deck.key_layout()))
+        finally:
+            deck.close()
+
+
 class DeviceSource(object):
     def __init__(self):
         super().__init__()
@@ -16,33 +45,59 @@ class DeviceSource(object):
     def matches(self, identifier: str, deck: StreamDeck) -> bool:
         pass
 
+    def get_info(self, identifier: str) -> Optional[DeviceInfo]:
+        return None
+
     def request(self, user_identifier: str) -> None:
         pass
 
     def enumerate(self) -> Sequence[StreamDeck]:
         pass
 
+    def close(self) -> None:
+        pass
+
 
 class HardwareDeviceSource(DeviceSource):
     def __init__(self):
         super().__init__()
         self.mgr = DeviceManager()
+        self.decks: Dict[str, StreamDeck] = {}
+        self.info: Dict[str, DeviceInfo] = {}
+        self.probes = 0
 
     def rescan(self) -> Sequence[str]:
-        return [d.id().decode("ascii") for d in self.mgr.enumerate()]
+        decks = {}
+        for deck in self.mgr.enumerate():
+            ident = device_id(deck)
+            decks[ident] = self.decks.get(ident, deck)
+        self.decks = decks
+
+        for ident in list(self.info):
+            if ident not in decks:
+                del self.info[ident]
+        return list(decks)
 
     def get_scanned(self, identifier: str) -> Optional[StreamDeck]:
-        for dev in self.enumerate():
-            if dev.id().decode("ascii") == identifier:
-                return dev
-        return None
+        if identifier not in self.decks:
+            self.rescan()
+        return self.decks.get(identifier)
+
+    def describe(self, deck: StreamDeck) -> DeviceInfo:
+        ident = device_id(deck)
+        info = self.info.get(ident)
+        if info is None:
+            info = DeviceInfo.probe(deck)
+            self.probes += 1
+            if self.decks.get(ident) is deck:
+                self.info[ident] = info
+        return info
+
+    def get_info(self, identifier: str) -> Optional[DeviceInfo]:
+        return self.info.get(identifier)
 
     def matches(self, identifier: str, deck: StreamDeck) -> bool:
-        deck.open()
-        try:
-            return deck.get_serial_number() == identifier
-        finally:
-            deck.close()
+        return self.describe(deck).serial == identifier
 
     def request(self, user_ident: str) -> None:
         pass
@@ -55,25 +110,48 @@ class DeviceSourceDispatch(DeviceSource):
     def __init__(self, **managers: DeviceSource):
         super().__init__()
         self.managers: Dict[str, DeviceSource] = managers
+        self.index: Dict[str, Tuple[DeviceSource, str]] = {}
 
     def rescan(self) -> Sequence[str]:
-        result: List[str] = []
+        index: Dict[str, Tuple[DeviceSource, str]] = {}
         for name, mgr in self.managers.items():
-            result.extend(name + "/" + d for d in mgr.rescan())
-        return result
+            for d in mgr.rescan():
+                index[name + "/" + d] = (mgr, d)
+        self.index = index
+        return list(index)
+
+    def _lookup(self, identifier: str) -> Optional[Tuple[DeviceSource, str]]:
+        entry = self.index.get(identifier)
+        if entry is not None:
+            return entry
 
-    def get_scanned(self, identifier: str) -> Optional[StreamDeck]:
         if identifier.count("/") != 1:
             return None
 
         src, identifier = identifier.split("/", 1)
-        return self.managers[src].get_scanned(identifier)
+        if src not in self.managers:
+            return None
+        return self.managers[src], identifier
+
+    def get_scanned(self, identifier: str) -> Optional[StreamDeck]:
+        entry = self._lookup(identifier)
+        if entry is None:
+            return None
+        return entry[0].get_scanned(entry[1])
+
+    def get_info(self, identifier: str) -> Optional[DeviceInfo]:
+        entry = self._lookup(identifier)
+        if entry is None:
+            return None
+        return entry[0].get_info(entry[1])
 
     def matches(self, identifier: str, deck: StreamDeck):
         if identifier.count(":") != 1:
             return False
 
         src, identifier = identifier.split(":", 1)
+        if src not in self.managers:
+            return False
         return self.managers[src].matches(identifier, deck)
 
     def request(self, identifier: str):
@@ -81,6 +159,8 @@ class DeviceSourceDispatch(DeviceSource):
             return False
 
         src, identifier = identifier.split(":", 1)
+        if src not in self.managers:
+            return None
         return self.managers[src].request(identifier)
 
 
@@ -90,8 +170,172 @@ class DeviceSourceDispatch(DeviceSource):
             result.extend(mgr.enumerate())
         return result
 
+    def close(self) -> None:
+        for mgr in self.managers.values():
+            mgr.close()
+
+
+def parse_uevent(data: bytes) -> Dict[str, str]:
+    if data.startswith(b"libudev\0"):
+        _, offset, length = struct.unpack_from("=III", data, 12)
+        data = data[offset:offset+length]
+    else:
+        data = data.split(b"\0", 1)[-1]
+
+    result = {}
+    for entry in data.split(b"\0"):
+        key, sep, value = entry.decode("utf-8", "replace").partition("=")
+        if sep:
+            result[key] = value
+    return result
+
+
+class DeviceEventSource(object):
+
+    def start(self, loop: AbstractEventLoop, callback: Callable[[str, str], None]) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class NetlinkEventSource(DeviceEventSource):
+    NETLINK_KOBJECT_UEVENT = 15
+    GROUP_KERNEL = 1
+    GROUP_UDEV = 2
+
+    def __init__(self, group: int=GROUP_UDEV, vendor: str="0FD9"):
+        super().__init__()
+        self.group = group
+        self.vendor = f":{vendor.upper()}:"
+        self.loop: Optional[AbstractEventLoop] = None
+        self.sock: Optional[socket.socket] = None
+        self.callback: Optional[Callable[[str, str], None]] = None
+
+    def start(self, loop: AbstractEventLoop, callback: Callable[[str, str], None]) -> None:
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_NONBLOCK | socket.SOCK_CLOEXEC, self.NETLINK_KOBJECT_UEVENT)
+        self.sock.bind((0, self.group))
+        self.loop = loop
+        self.callback = callback
+        loop.add_reader(self.sock.fileno(), self._readable)
+
+    def stop(self) -> None:
+        if self.sock is None:
+            return
+
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+        self.sock = None
+
+    def _readable(self) -> None:
+        while self.sock is not None:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                return
+
+            event = parse_uevent(data)
+            if event.get("SUBSYSTEM") != "hidraw":
+                continue
+            if self.vendor not in event.get("DEVPATH", "").upper():
+                continue
+            self.callback(event.get("ACTION", ""), event["DEVPATH"])
+
+
+class ManualEventSource(DeviceEventSource):
+
+    def __init__(self):
+        super().__init__()
+        self.callback: Optional[Callable[[str, str], None]] = None
+
+    def start(self, loop: AbstractEventLoop, callback: Callable[[str, str], None]) -> None:
+        self.callback = callback
+
+    def stop(self) -> None:
+        self.callback = None
+
+    def fire(self, action: str="add", path: str="") -> None:
+        if self.callback is not None:
+            self.callback(action, path)
+
+
+class HotplugDeviceSource(DeviceSource):
+    def __init__(self, source: DeviceSource, events: DeviceEventSource, settle: float=0.02):
+        super().__init__()
+        self.source = source
+        self.events = events
+        self.settle = settle
+        self.logger = logging.getLogger("streamdeckd.hotplug")
+
+        self.loop: Optional[AbstractEventLoop] = None
+        self.on_change: Optional[Callable[[], Any]] = None
+        self._scanned: Optional[List[str]] = None
+        self._handle: Optional[Handle] = None
+
+        self.events_seen = 0
+        self.enumerations = 0
+
+    def start(self, loop: AbstractEventLoop, on_change: Callable[[], Any]) -> None:
+        self.loop = loop
+        self.on_change = on_change
+        self.events.start(loop, self._event)
+
+    def _event(self, action: str, path: str) -> None:
+        self.logger.debug(f"Device event: {action} {path}")
+        self.events_seen += 1
+        self._scanned = None
+
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = self.loop.call_later(self.settle, self._settled)
+
+    def _settled(self) -> None:
+        self._handle = None
+        if self.on_change is not None:
+            self.on_change()
+
+    def rescan(self) -> Sequence[str]:
+        if self._scanned is None:
+            self._scanned = list(self.source.rescan())
+            self.enumerations += 1
+        return list(self._scanned)
+
+    def get_scanned(self, identifier: str) -> Optional[StreamDeck]:
+        return self.source.get_scanned(identifier)
+
+    def matches(self, identifier: str, deck: StreamDeck) -> bool:
+        return self.source.matches(identifier, deck)
+
+    def get_info(self, identifier: str) -> Optional[DeviceInfo]:
+        return self.source.get_info(identifier)
+
+    def request(self, identifier: str) -> None:
+        return self.source.request(identifier)
+
+    def enumerate(self) -> Sequence[StreamDeck]:
+        return self.source.enumerate()
+
+    def close(self) -> None:
+        self.events.stop()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self.source.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "events": self.events_seen,
+            "enumerations": self.enumerations
+        }
+
 
 def get_default_source() -> DeviceSource:
-    return DeviceSourceDispatch(
-        usb=HardwareDeviceSource()
-    )
\ No newline at end of file
+    from streamdeckd.virtual import VirtualDeviceSource
+
+    managers: Dict[str, DeviceSource] = {}
+    try:
+        managers["usb"] = HardwareDeviceSource()
+    except Exception as e:
+        logging.getLogger("streamdeckd.devices").warning(f"USB devices are unavailable: {e}")
+    managers["virtual"] = VirtualDeviceSource()
+    return DeviceSourceDispatch(**managers)
\ No newline at end of file
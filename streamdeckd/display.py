@@ -1,18 +1,231 @@
+import os
+import asyncio
+import hashlib
+import logging
 from asyncio import get_running_loop
-from typing import Dict, Tuple, Optional
+from typing import Dict, Tuple, Optional, Any, List, Iterable, Set, Union
 
 from PIL import Image, ImageDraw, ImageFont
 
 from StreamDeck.ImageHelpers import PILHelper
 from StreamDeck.Devices.StreamDeck import StreamDeck
 
-from streamdeckd.state import State, StateVariable
-from streamdeckd.utils import parse_color, ColorStateVariable, TimeSpanStateVariable, ImageStateVariable, LiveVariable
-from streamdeckd.variables import Variables
+from streamdeckd.state import State, StateVariable, Plan, compile_plan
+from streamdeckd.utils import parse_color, ColorStateVariable, TimeSpanStateVariable, ImageStateVariable, LiveVariable, image_key, resize_image
+from streamdeckd import cache
+from streamdeckd.cache import LRUCache
+from streamdeckd.assets import Asset
+from streamdeckd.animation import Animation
+from streamdeckd.variables import Variables, ObservableDict, template_names
+from streamdeckd.writer import DeviceWriter
+from streamdeckd.devices import DeviceInfo
 
 
 
-_FONTCACHE: Dict[Tuple[str, int], ImageFont.ImageFont] = {}
+def _font_bytes(font: ImageFont.ImageFont) -> int:
+    path = getattr(font, "path", None)
+    if isinstance(path, str):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            pass
+    return 64*1024
+
+
+_FONTCACHE: LRUCache[Tuple[str, int], ImageFont.ImageFont] = cache.register("fonts", LRUCache(64*1024*1024, sizeof=_font_bytes, max_entries=64))
+
+
+def get_font(name: str, size: int) -> ImageFont.ImageFont:
+    key = (name, size)
+    font = _FONTCACHE.get(key)
+    if font is not None:
+        return font
+
+    if not name:
+        font = ImageFont.load_default()
+    else:
+        font = ImageFont.truetype(name, size=size)
+    _FONTCACHE.put(key, font)
+
+    return font
+
+
+def preload_fonts(fonts: Iterable[Tuple[str, int]]) -> None:
+    for name, size in fonts:
+        try:
+            get_font(name, size)
+        except OSError as e:
+            logging.getLogger("streamdeckd").warning(f"Could not load font {name!r} at size {size}: {e}")
+
+
+TextLayout = Tuple[int, int, Image.Image, Tuple[int, int]]
+
+_TEXT_LAYOUTS: LRUCache[Tuple[str, int, str], TextLayout] = cache.register("text", LRUCache(2*1024*1024, sizeof=lambda layout: layout[2].width * layout[2].height + 64))
+_MEASURE = ImageDraw.Draw(Image.new("L", (1, 1)))
+
+
+def text_layout(name: str, size: int, text: str) -> TextLayout:
+    key = (name, size, text)
+    layout = _TEXT_LAYOUTS.get(key)
+    if layout is not None:
+        return layout
+
+    font = get_font(name, size)
+    left, top, right, bottom = _MEASURE.multiline_textbbox((0, 0), text, font=font)
+    if hasattr(_MEASURE, "textsize"):
+        width, height = _MEASURE.textsize(text, font=font)
+    else:
+        width, height = right - left, bottom - top
+
+    ox, oy = max(-left, 0), max(-top, 0)
+    mask = Image.new("L", (max(right + ox, 0), max(bottom + oy, 0)))
+    ImageDraw.Draw(mask).text((ox, oy), text, font=font, fill=255)
+
+    layout = (width, height, mask, (ox, oy))
+    _TEXT_LAYOUTS.put(key, layout)
+    return layout
+
+
+def draw_key(img: Image.Image, state: Dict[str, Any]) -> None:
+    text = state["text"]
+    image = state["image"]
+
+    draw = ImageDraw.Draw(img)
+    draw.rectangle(((0, 0), (img.width, img.height)), fill=state["bg"])
+
+    tw, th, mask, (ox, oy) = text_layout(state["font"], state["size"], text)
+
+    tx = (img.width - tw) // 2
+
+    if not image:
+        ty = (img.height - th) // 2
+    else:
+        iw = img.width - th - 15
+        ih = img.height - th - 15
+
+        if isinstance(image, Asset):
+            image = image.fitted(img.size)
+        resized = resize_image(image, (iw, ih))
+        if img.mode == "RGBA":
+            img.paste(resized, ((img.width - iw)//2, 5), resized)
+        else:
+            img.paste(resized, ((img.width - iw)//2, 5))
+
+        ty = img.height - 5 - th
+
+    if mask.width and mask.height:
+        img.paste(state["fg"], (tx - ox, ty - oy, tx - ox + mask.width, ty - oy + mask.height), mask)
+
+
+class KeyFormat:
+
+    def __init__(self, deck: StreamDeck):
+        self.image_format = dict(deck.key_image_format())
+        self.key = (
+            deck.deck_type(),
+            self.image_format["format"],
+            tuple(self.image_format["size"]),
+            tuple(self.image_format["flip"]),
+            self.image_format["rotation"]
+        )
+
+    def key_image_format(self) -> Dict[str, Any]:
+        return self.image_format
+
+    def frame_key(self, state: Dict[str, Any]) -> Tuple[Any, ...]:
+        return (
+            self.key,
+            state["text"],
+            state["bg"],
+            state["fg"],
+            image_key(state["image"]),
+            state["font"],
+            state["size"]
+        )
+
+
+def render_key(fmt: KeyFormat, state: Dict[str, Any]) -> Union[bytes, Animation]:
+    image = state["image"]
+    if isinstance(image, Asset) and image.animated:
+        return render_animation(fmt, state)
+
+    img = PILHelper.create_image(fmt)
+    draw_key(img, state)
+    return PILHelper.to_native_format(fmt, img)
+
+
+def render_animation(fmt: KeyFormat, state: Dict[str, Any]) -> Animation:
+    asset = state["image"]
+    img = PILHelper.create_image(fmt)
+
+    frames = []
+    for frame in asset.frames(img.size):
+        draw_key(img, {**state, "image": frame})
+        frames.append(PILHelper.to_native_format(fmt, img))
+    return Animation(frames, asset.durations)
+
+
+class DeviceShadow:
+
+    def __init__(self, device: DeviceWriter):
+        self.device = device
+        self.device.failed = self._write_failed
+        self.brightness: Optional[float] = None
+        self.keys: Dict[int, bytes] = {}
+
+        self.writes_issued = 0
+        self.writes_avoided = 0
+        self.writes_failed = 0
+
+    def set_brightness(self, brightness: float) -> None:
+        if brightness == self.brightness:
+            self.writes_avoided += 1
+            return
+
+        self.device.set_brightness(brightness)
+        self.brightness = brightness
+        self.writes_issued += 1
+
+    def set_key_image(self, key: int, raw: bytes) -> None:
+        digest = hashlib.blake2b(raw, digest_size=16).digest()
+        if self.keys.get(key, None) == digest:
+            self.writes_avoided += 1
+            return
+
+        self.device.set_key_image(key, raw)
+        self.keys[key] = digest
+        self.writes_issued += 1
+
+    def _write_failed(self, slot: Any) -> None:
+        self.writes_failed += 1
+        if slot == "brightness":
+            self.brightness = None
+        else:
+            self.keys.pop(slot[1], None)
+
+    def reset(self) -> asyncio.Future:
+        self.brightness = None
+        self.keys.clear()
+        return self.device.reset()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "writes_issued": self.writes_issued,
+            "writes_avoided": self.writes_avoided,
+            "writes_failed": self.writes_failed
+        }
+
+
+BUTTON_DEFAULTS = {
+    "text": "",
+    "font": "",
+    "size": "10",
+    "image": "",
+    "bg": "#000",
+    "fg": "#FFF",
+    "pressed": None,
+    "released": None
+}
 
 
 class Button(State):
@@ -44,12 +257,12 @@ class Button(State):
             "size": None
         }
 
-        self.d_vars = {
+        self.d_vars = ObservableDict({
             "x": self.x,
             "y": self.y,
             "p": self.p,
-            "state": LiveVariable(lambda: self.state)
-        }
+            "state": self.state
+        })
         self.s_vars = self.parent.s_vars.make_child()
         self.s_vars.add_map(self.d_vars)
 
@@ -69,21 +282,10 @@ class Button(State):
             "size": self.size
         }
 
-    def _get_font(self):
-        if not self.font:
-            return ImageFont.load_default()
-
-        key = (self.font, self.size)
-        if key in _FONTCACHE:
-            return _FONTCACHE[key]
-        
-        font = ImageFont.truetype(self.font, size=self.size)
-        _FONTCACHE[key] = font
-
-        return font
+    def is_volatile(self) -> bool:
+        return self.s_vars.is_volatile(template_names(self.text))
 
-    def draw(self):
-        img = self._shown_image
+    def prepare(self) -> Optional[Dict[str, Any]]:
         text = self.s_vars.format(self.text)
         text = text.replace("\\n", "\n")
 
@@ -92,31 +294,18 @@ class Button(State):
             return None
         self.parent.app.logger.debug(f"Change detected at: {self.x},{self.y} => Rerendering")
         self._display_state = new_state
+        return new_state
 
-        draw = ImageDraw.Draw(img)
-        draw.rectangle(((0, 0), (img.width, img.height)), fill=self.bg)
-
-        font = self._get_font()
-        tw, th = draw.textsize(text, font=font)
-
-        tx = (img.width - tw) // 2
+    def invalidate(self):
+        self._display_state = dict.fromkeys(self._display_state)
 
-        if not self.image:
-            ty = (img.height - th) // 2
-        else:
-            iw = img.width - th - 15
-            ih = img.height - th - 15
-
-            resized = self.image.resize((iw, ih), Image.BICUBIC)
-            if img.mode == "RGBA":
-                img.paste(resized, ((img.width - iw)//2, 5), resized)
-            else:
-                img.paste(resized, ((img.width - iw)//2, 5))
-
-            ty = img.height - 5 - th
+    def draw(self):
+        state = self.prepare()
+        if state is None:
+            return None
 
-        draw.text((tx, ty), text, font=font, fill=self.fg)
-        return img
+        draw_key(self._shown_image, state)
+        return self._shown_image
 
     async def when_key_pressed(self):
         self._pressed = True
@@ -134,19 +323,14 @@ class Button(State):
             get_running_loop().create_task(self.released.apply_actions(self.parent.app, self))
 
     def reset(self, *, with_state=False):
-        self.text = ""
-        self.font = ""
-        self.size = "10"
-        self.image = ""
-        self.bg = "#000"
-        self.fg = "#FFF"
+        self.apply_plan(_RESET_PLAN)
         if with_state:
             self.state = ""
             self._current_state = None
 
-        self.pressed = None
-        self.released = None
-
+    def apply_plan(self, plan: Plan):
+        super().apply_plan(plan)
+        self._plan = plan
         self._pressed = False
 
     def __repr__(self):
@@ -157,6 +341,7 @@ class Button(State):
         if self._current_state is not None:
             get_running_loop().create_task(self._current_state.when_leaving(self.parent.app, self))
 
+        self.d_vars["state"] = new
         self._current_state = self.parent.get_state_of(self, new)
         self.parent.apply_button_contexts(self)
         self._pressed = False
@@ -165,6 +350,9 @@ class Button(State):
             get_running_loop().create_task(self._current_state.when_entered(self.parent.app, self))
 
 
+_RESET_PLAN = compile_plan(Button, BUTTON_DEFAULTS)
+
+
 class Display(State):
     fps = StateVariable.with_parser(float, 0)
     brightness = StateVariable.with_parser(float, 1.0)
@@ -172,22 +360,37 @@ class Display(State):
     menu = StateVariable()
 
 
-    def __init__(self, app: 'streamdeckd.application.Streamdeckd', ctx: 'streamdeckd.config.streamdeck.StreamDeckContext', deck: StreamDeck):
+    def __init__(self, app: 'streamdeckd.application.Streamdeckd', ctx: 'streamdeckd.config.streamdeck.StreamDeckContext', deck: StreamDeck, info: Optional[DeviceInfo]=None):
         super().__init__(None)
         self.app = app
         self.deck = deck
+        self.info = info
         self.ctx = ctx
         self._should_render = False
+        self._dirty: Optional[Set[Button]] = set()
+        self._opened = False
+
+        self._format = KeyFormat(deck)
+        self.writer = DeviceWriter(deck, get_running_loop())
+        self.shadow = DeviceShadow(self.writer)
+        self._generations: Dict[int, int] = {}
+        self.renders = 0
+        self._pending: Dict[int, asyncio.Future] = {}
 
-        self.d_vars = {}
+        self.d_vars = ObservableDict()
         self.s_vars = self.app.variables.make_child()
         self.s_vars.add_map(self.d_vars)
+        self.s_vars.subscribe(self._variable_changed)
 
         self.current_menu = None
+        self._render_job: Optional[int] = None
 
         self.buttons: Dict[Tuple[int, int], Button] = {}
 
     async def when_key_state_changed(self, _, kid: int, pressed: bool):
+        if self.app.recorder is not None:
+            self.app.recorder.key(self.d_vars["serial_number"], kid, pressed)
+
         y, x = divmod(kid, self.deck.key_layout()[1])
         btn = self.buttons[(x, y)]
         if pressed:
@@ -210,89 +413,248 @@ class Display(State):
         return sctx
 
     def apply_button_contexts(self, btn: Button):
-        loc = (btn.x, btn.y)
-        bctx = self.current_menu.buttons.get(loc, None)
-        sctx = None
-        if bctx is not None:
-            sctx = bctx.get_state(btn.state)
-
-        btn.reset()
-        btn.apply(self.ctx.state, exclude_classes=[Display])
-        btn.apply(self.current_menu.state, exclude_classes=[Display])
-        if bctx is not None:
-            btn.apply(bctx.state, exclude_classes=[Display])
-        if sctx is not None:
-            btn.apply(sctx.state, exclude_classes=[Display])
+        btn.apply_plan(self.current_menu.plan_for((btn.x, btn.y), btn.state))
 
     async def _update(self):
-        self.render_now()
+        self.render_now([btn for btn in self.buttons.values() if btn.is_volatile()])
+
+    def _variable_changed(self, name: str) -> None:
+        if not self._opened:
+            return
+
+        dirty = [btn for btn in self.buttons.values() if name in template_names(btn.text)]
+        if dirty:
+            self.render(dirty)
+
+    def render(self, buttons: Optional[Iterable[Button]]=None) -> None:
+        if buttons is None:
+            self._dirty = None
+        elif self._dirty is not None:
+            self._dirty.update(buttons)
 
-    def render(self) -> None:
         if self._should_render:
             return
 
         self._should_render = True
-        get_running_loop().call_later(0.05, self.render_now)
+        get_running_loop().call_later(0.05, lambda: self.render_now(self._dirty))
 
-    def render_now(self) -> None:
+    def render_now(self, buttons: Optional[Iterable[Button]]=None) -> None:
         self._should_render = False
+        self._dirty = set()
         self.app.logger.debug(f"Rendering {self.deck.id()}")
         width = self.deck.key_layout()[1]
 
-        self.deck.set_brightness(self.brightness)
+        self.shadow.set_brightness(self.brightness)
+
+        if buttons is not None:
+            buttons = set(buttons)
+        targets = [
+            (y*width + x, btn)
+            for (x, y), btn in self.buttons.items()
+            if buttons is None or btn in buttons
+        ]
+
+        if self.app.render_pool is not None:
+            self._render_pooled(targets)
+            return
+
+        cache = self.app.frame_cache
+        for p, btn in targets:
+            state = btn.prepare()
+            if state is None:
+                continue
 
-        for (x, y), btn in self.buttons.items():
-            p = y*width + x
+            raw = None
+            if cache is not None:
+                key = self._format.frame_key(state)
+                raw = cache.get(key)
 
-            raw = self._draw(x, y, btn)
             if raw is None:
+                self.renders += 1
+                raw = self._draw(btn, state)
+                if cache is not None:
+                    cache.put(key, raw)
+
+            self._show(p, raw)
+
+    def _draw(self, btn: Button, state: Dict[str, Any]) -> Union[bytes, Animation]:
+        image = state["image"]
+        if isinstance(image, Asset) and image.animated:
+            return render_animation(self._format, state)
+
+        draw_key(btn._shown_image, state)
+        return PILHelper.to_native_format(self.deck, btn._shown_image)
+
+    def _show(self, p: int, raw: Union[bytes, Animation]) -> None:
+        if isinstance(raw, Animation):
+            self.app.animations.play(self, p, raw)
+            return
+
+        self.app.animations.stop(self, p)
+        self.shadow.set_key_image(p, raw)
+
+    def _render_pooled(self, targets: List[Tuple[int, Button]]) -> None:
+        loop = get_running_loop()
+
+        cache = self.app.frame_cache
+
+        jobs: List[Tuple[int, Button, int, Any, asyncio.Future]] = []
+        for p, btn in targets:
+            state = btn.prepare()
+            if state is None:
                 continue
-            self.deck.set_key_image(p, raw)
 
-    def _draw(self, x: int, y: int, btn: Button):
-        img = btn.draw()
-        if img is None:
-            return None
-        return PILHelper.to_native_format(self.deck, img)
-        
-    def open(self) -> None:
-        self.deck.open()
+            generation = self._generations.get(p, 0) + 1
+            self._generations[p] = generation
+
+            superseded = self._pending.pop(p, None)
+            if superseded is not None:
+                superseded.cancel()
+
+            key = None
+            if cache is not None:
+                key = self._format.frame_key(state)
+                raw = cache.get(key)
+                if raw is not None:
+                    self._show(p, raw)
+                    continue
+
+            self.renders += 1
+            fut = loop.run_in_executor(self.app.render_pool, render_key, self._format, state)
+            self._pending[p] = fut
+            jobs.append((p, btn, generation, key, fut))
+
+        if jobs:
+            loop.create_task(self._apply_frames(jobs))
+
+    async def _apply_frames(self, jobs: List[Tuple[int, Button, int, Any, asyncio.Future]]) -> None:
+        results = await asyncio.gather(*(fut for _, _, _, _, fut in jobs), return_exceptions=True)
+
+        cache = self.app.frame_cache
+        for (p, btn, generation, key, fut), raw in sorted(zip(jobs, results), key=lambda job: job[0][0]):
+            if self._generations.get(p) != generation:
+                self.app.logger.debug(f"Dropping stale frame for key {p}")
+                continue
+            if self._pending.get(p) is fut:
+                del self._pending[p]
+
+            if isinstance(raw, asyncio.CancelledError):
+                btn.invalidate()
+                continue
+            if isinstance(raw, BaseException):
+                self.app.logger.error(f"Failed to render key {p}: {raw!r}")
+                btn.invalidate()
+                continue
+            if cache is not None and key is not None:
+                cache.put(key, raw)
+            if not self._opened:
+                return
+
+            self._show(p, raw)
+
+    async def open(self) -> None:
+        self.writer.start()
+        await self.writer.call(self.deck.open)
+        self._opened = True
         self.deck.set_key_callback_async(self.when_key_state_changed)
 
-        self.apply(self.ctx.state)
-        self.d_vars["serial_number"] = self.deck.get_serial_number()
-        self.d_vars["firmware_version"] = self.deck.get_firmware_version()
+        self.apply_plan(self.ctx.plan)
+        if self.info is None:
+            self.d_vars["serial_number"] = await self.writer.call(self.deck.get_serial_number)
+            self.d_vars["firmware_version"] = await self.writer.call(self.deck.get_firmware_version)
+            layout = self.deck.key_layout()
+        else:
+            self.d_vars["serial_number"] = self.info.serial
+            self.d_vars["firmware_version"] = self.info.firmware
+            layout = self.info.layout
+        self.app.stats[f"deck.{self.d_vars['serial_number']}"] = self.stats
 
-        layout = self.deck.key_layout()
         for y in range(layout[0]):
             for x in range(layout[1]):
                 self.buttons[(x, y)] = Button(x, y, self)
 
         self.menu = None
         
-        fakebtn = Button(-1, -1, self)
         if self.ctx.connected is not None:
             get_running_loop().create_task(self.ctx.connected.apply_actions(self.app, Button(-1, -1, self)))
 
-        sigcbs = []
-        for signal, sig_ctx, cb_holder in self.ctx.signals:
-            cb = (lambda ctx: (lambda: ctx.apply_actions(self.app, fakebtn)))(sig_ctx)
-            cb_holder[0] = cb
-            signal.register(cb)
+        self.ctx.attach(self.app, Button(-1, -1, self))
+        self._schedule_updates()
+
+    def _schedule_updates(self) -> None:
+        if self._render_job is not None:
+            self.app.scheduler.remove_recurring(self._render_job)
+            self._render_job = None
 
         if self.fps:
-            self.app.scheduler.add_recurring(1.0 / self.fps, self._update)
+            self._render_job = self.app.scheduler.add_recurring(1.0 / self.fps, self._update, name=f"render.{self.d_vars['serial_number']}")
 
-    def close(self) -> None:
-        try:
-            for signal, sig_ctx, cb_holder in self.ctx.signals:
-                cb = cb_holder[0]
-                signal.unregister(cb)
-                cb_holder[0] = None
+    def reload(self, ctx: 'streamdeckd.config.streamdeck.StreamdeckContext') -> None:
+        self.ctx.detach(self.app, None)
+        for btn in self.buttons.values():
+            if btn._current_state is not None:
+                btn._current_state.detach(self.app, btn)
+                btn._current_state = None
 
-            self.deck.reset()
+        fps = self.fps
+        self.ctx = ctx
+        del self.fps
+        del self.brightness
+        self.apply_plan(tuple((variable, value) for variable, value in ctx.plan if variable.name != "menu"))
+
+        self.current_menu = ctx.get_menu(self.menu)
+        for loc, btn in self.buttons.items():
+            bctx = self.current_menu.buttons.get(loc, None)
+            if bctx is None:
+                plan = self.current_menu.plan_for(loc, None)
+                if btn.state == "" and btn._plan == plan:
+                    continue
+                btn.reset(with_state=True)
+                btn.apply_plan(plan)
+                continue
+
+            name = btn.state if btn.state in bctx.state_index else bctx.get_state(None).name
+            if name != btn.state:
+                btn.state = name
+                continue
+
+            btn._current_state = bctx.get_state(btn.state)
+            self.apply_button_contexts(btn)
+            btn._current_state.attach(self.app, btn)
+
+        ctx.attach(self.app, Button(-1, -1, self))
+        if self.fps != fps:
+            self._schedule_updates()
+
+        self.render_now()
+
+    async def close(self) -> None:
+        self._opened = False
+        self.app.animations.stop_display(self)
+        for fut in self._pending.values():
+            fut.cancel()
+        self._pending.clear()
+
+        try:
+            self.ctx.detach(self.app, None)
+            if self._render_job is not None:
+                self.app.scheduler.remove_recurring(self._render_job)
+                self._render_job = None
+
+            self.s_vars.detach()
+            self.app.stats.pop(f"deck.{self.d_vars.get('serial_number')}", None)
+            await self.shadow.reset()
         finally:
-            self.deck.close()
+            try:
+                await self.writer.call(self.deck.close)
+            finally:
+                await self.writer.stop()
+
+    async def flush(self) -> None:
+        await self.writer.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.shadow.stats(), **self.writer.stats(), "renders": self.renders}
     
     @menu.changed
     def menu(self, old, new):
@@ -0,0 +1,65 @@
+import ast
+import contextlib
+import importlib.util
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional
+
+
+class Manifest:
+
+    def __init__(self, name: str, *, actions: Iterable[str]=(), signals: Iterable[str]=(), directives: Iterable[str]=(), variables: Iterable[str]=()):
+        self.name = name
+        self.actions: FrozenSet[str] = frozenset(actions)
+        self.signals: FrozenSet[str] = frozenset(signals)
+        self.directives: FrozenSet[str] = frozenset(directives)
+        self.variables: FrozenSet[str] = frozenset(variables)
+
+    @property
+    def eager(self) -> bool:
+        return bool(self.variables) or not (self.actions or self.signals or self.directives)
+
+    def provides(self, kind: str, name: str) -> bool:
+        return name in getattr(self, kind)
+
+
+MANIFESTS: Dict[str, Optional[Manifest]] = {}
+
+
+def read_manifest(name: str) -> Optional[Manifest]:
+    spec = importlib.util.find_spec(f"streamdeckd_ext.{name}")
+    if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+        return None
+
+    with open(spec.origin, "rb") as f:
+        tree = ast.parse(f.read(), spec.origin)
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(target, ast.Name) and target.id == "MANIFEST" for target in node.targets):
+            return Manifest(name, **ast.literal_eval(node.value))
+    return None
+
+
+def manifest(name: str) -> Optional[Manifest]:
+    if name not in MANIFESTS:
+        try:
+            MANIFESTS[name] = read_manifest(name)
+        except (ImportError, OSError, SyntaxError, ValueError, TypeError):
+            MANIFESTS[name] = None
+    return MANIFESTS[name]
+
+
+_LOADERS: List['streamdeckd.config.application.ApplicationContext'] = []
+
+
+@contextlib.contextmanager
+def loading(ctx: 'streamdeckd.config.application.ApplicationContext') -> Iterator[None]:
+    _LOADERS.append(ctx)
+    try:
+        yield
+    finally:
+        _LOADERS.remove(ctx)
+
+
+def resolve(kind: str, name: str) -> bool:
+    if not _LOADERS:
+        return False
+    return _LOADERS[-1].load_deferred(kind, name)
@@ -0,0 +1,70 @@
+import json
+import time
+from typing import Optional, Dict, List, Tuple, Any, IO, Iterator, Callable, Mapping
+
+from streamdeckd.variables import ObservableDict
+
+
+RECORD_VERSION = 1
+RECORDED_TYPES = (str, int, float, bool, type(None))
+
+
+class Recorder:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file: Optional[IO[str]] = None
+        self.start_time = 0.0
+        self.counts: Dict[str, int] = {}
+        self._watched: Dict[str, Tuple[ObservableDict, Callable[[str], None]]] = {}
+
+    def open(self) -> None:
+        self.file = open(self.path, "w", encoding="utf-8")
+        self.start_time = time.perf_counter()
+        self._write("start", RECORD_VERSION)
+
+    def _write(self, kind: str, *data: Any) -> None:
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if self.file is None:
+            return
+        entry = [round(time.perf_counter() - self.start_time, 6), kind, *data]
+        self.file.write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+
+    def deck(self, identifier: str, serial: str, deck_type: str, image_format: str, layout: Tuple[int, int]) -> None:
+        self._write("deck", identifier, serial, deck_type, image_format, layout[0], layout[1])
+
+    def key(self, serial: str, key: int, pressed: bool) -> None:
+        self._write("key", serial, key, int(pressed))
+
+    def signal(self, label: str) -> None:
+        self._write("signal", label)
+
+    def var(self, name: str, key: str, value: Any) -> None:
+        if isinstance(value, RECORDED_TYPES):
+            self._write("var", name, key, value)
+
+    def watch(self, maps: Mapping[str, ObservableDict]) -> None:
+        for name, values in maps.items():
+            if name in self._watched and self._watched[name][0] is values:
+                continue
+
+            cb = (lambda name, values: (lambda key: self.var(name, key, values.get(key, None))))(name, values)
+            values.subscribe(cb)
+            self._watched[name] = (values, cb)
+
+    def close(self) -> None:
+        for values, cb in self._watched.values():
+            values.unsubscribe(cb)
+        self._watched.clear()
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def read_log(path: str) -> Iterator[List[Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
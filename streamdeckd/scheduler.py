@@ -1,7 +1,61 @@
+import math
+import heapq
 import traceback
-from typing import Union, Callable, Awaitable, Any, Dict, Optional, cast
+from collections import deque
+from typing import Union, Callable, Awaitable, Any, Dict, Optional, List, Tuple, Deque, cast
 from datetime import timedelta
-from asyncio import AbstractEventLoop, Handle, Task
+from asyncio import AbstractEventLoop, Handle, Task, Future, current_task
+
+
+TOLERANCE = 0.001
+POLICIES = {"skip", "queue", "concurrent"}
+
+
+class _Job:
+
+    def __init__(self, idx: int, period: float, cb: Callable[[], Awaitable[Any]], policy: str, concurrency: int, name: str):
+        self.idx = idx
+        self.period = period
+        self.cb = cb
+        self.policy = policy
+        self.concurrency = concurrency
+        self.name = name
+
+        self.idle: Dict[Future, Task] = {}
+        self.workers: List[Task] = []
+        self.queued: Optional[float] = None
+
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.durations: Deque[float] = deque(maxlen=256)
+        self.duration_total = 0.0
+        self.lateness_total = 0.0
+        self.lateness_max = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        durations = sorted(self.durations)
+        p99 = durations[math.ceil(len(durations) * 0.99) - 1] if durations else 0.0
+        return {
+            "period": self.period,
+            "policy": self.policy,
+            "runs": self.runs,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "duration_mean": (self.duration_total / self.runs) if self.runs else 0.0,
+            "duration_p99": p99,
+            "lateness_mean": (self.lateness_total / self.runs) if self.runs else 0.0,
+            "lateness_max": self.lateness_max
+        }
+
+
+class _Bucket:
+    __slots__ = ("period", "tick", "jobs")
+
+    def __init__(self, period: float, tick: int):
+        self.period = period
+        self.tick = tick
+        self.jobs: Dict[int, _Job] = {}
 
 
 class Scheduler:
@@ -9,46 +63,171 @@ class Scheduler:
     def __init__(self, loop: AbstractEventLoop):
         super().__init__()
         self.loop = loop
-        self.jobs: Dict[int, Optional[Handle]] = {}
-        self.running: Dict[int, Task] = {}
+        self.epoch = loop.time()
+
+        self.jobs: Dict[int, _Job] = {}
+        self.buckets: Dict[float, _Bucket] = {}
+        self.heap: List[Tuple[float, float]] = []
+        self._handle: Optional[Handle] = None
         self._idx = 0
 
-    def _register_recurring(self, every: float, idx:int , cb: Callable[[], Awaitable[Any]]):
-        if idx not in self.jobs:
+        self.wakeups = 0
+
+    def _deadline(self, bucket: _Bucket) -> float:
+        return self.epoch + bucket.tick * bucket.period
+
+    def _arm(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+        while self.heap:
+            deadline, period = self.heap[0]
+            bucket = self.buckets.get(period, None)
+            if bucket is not None and self._deadline(bucket) == deadline:
+                break
+            heapq.heappop(self.heap)
+        else:
+            return
+
+        self._handle = self.loop.call_at(self.heap[0][0], self._tick)
+
+    def _tick(self) -> None:
+        self._handle = None
+        self.wakeups += 1
+        now = self.loop.time()
+
+        while self.heap and self.heap[0][0] <= now + TOLERANCE:
+            deadline, period = heapq.heappop(self.heap)
+            bucket = self.buckets.get(period, None)
+            if bucket is None or self._deadline(bucket) != deadline:
+                continue
+
+            for job in list(bucket.jobs.values()):
+                self._trigger(job, deadline)
+
+            bucket.tick = max(bucket.tick + 1, math.floor((now - self.epoch) / period) + 1)
+            heapq.heappush(self.heap, (self._deadline(bucket), period))
+
+        self._arm()
+
+    def _trigger(self, job: _Job, deadline: float) -> None:
+        while job.idle:
+            wakeup = next(iter(job.idle))
+            del job.idle[wakeup]
+            if not wakeup.done():
+                wakeup.set_result(deadline)
+                return
+
+        job.overruns += 1
+        if job.policy == "queue" and job.queued is None:
+            job.queued = deadline
             return
+        job.skipped += 1
 
-        self.jobs[idx] = self.loop.call_later(every, lambda: self._run_recurring(every, idx, cb))
+    async def _work(self, job: _Job) -> None:
+        while True:
+            if job.queued is not None:
+                deadline, job.queued = job.queued, None
+            else:
+                wakeup = self.loop.create_future()
+                job.idle[wakeup] = cast(Task, current_task())
+                deadline = await wakeup
 
-    def _run_recurring(self, every: float, idx, cb):
-        async def bootstrap_recurring():
+            start = self.loop.time()
+            lateness = max(start - deadline, 0.0)
             try:
-                await cb()
+                await job.cb()
             except Exception as e:
                 traceback.print_exception(type(e), e, e.__traceback__)
-            finally:
-                self.running.pop(idx, None)
-                self._register_recurring(every, idx, cb)
-        self.running[idx] = self.loop.create_task(bootstrap_recurring())
 
-    def add_recurring(self, every: Union[timedelta, int, float], cb: Callable[[], Awaitable[Any]]) -> int:
+            duration = self.loop.time() - start
+            job.runs += 1
+            job.durations.append(duration)
+            job.duration_total += duration
+            job.lateness_total += lateness
+            job.lateness_max = max(job.lateness_max, lateness)
+
+            if self.jobs.get(job.idx, None) is not job:
+                return
+
+    def add_recurring(self, every: Union[timedelta, int, float], cb: Callable[[], Awaitable[Any]], *, policy: str="skip", concurrency: int=1, name: Optional[str]=None) -> int:
         if isinstance(every, timedelta):
             every = cast(float, every.total_seconds())
+        every = float(every)
+
+        if every <= 0:
+            raise ValueError(f"Recurring period must be positive, got {every:g}s")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overrun policy '{policy}'")
+        if policy != "concurrent":
+            concurrency = 1
+        if concurrency < 1:
+            raise ValueError(f"Concurrency limit must be at least 1, got {concurrency}")
 
         idx = self._idx
         self._idx += 1
-        self.jobs[idx] = None
-        self._register_recurring(every, idx, cb)
+
+        job = _Job(idx, every, cb, policy, concurrency, name or f"job{idx}")
+        for _ in range(concurrency):
+            job.workers.append(self.loop.create_task(self._work(job)))
+        self.jobs[idx] = job
+
+        bucket = self.buckets.get(every, None)
+        if bucket is None:
+            tick = math.floor((self.loop.time() - self.epoch) / every) + 1
+            bucket = _Bucket(every, tick)
+            self.buckets[every] = bucket
+            heapq.heappush(self.heap, (self._deadline(bucket), every))
+            self._arm()
+        bucket.jobs[idx] = job
+
         return idx
 
     def remove_recurring(self, id: int):
-        handle: Optional[Handle] = self.jobs.pop(id, None)
-        if not handle:
+        job: Optional[_Job] = self.jobs.pop(id, None)
+        if job is None:
             return
-        handle.cancel()
+
+        bucket = self.buckets[job.period]
+        del bucket.jobs[id]
+        if not bucket.jobs:
+            del self.buckets[job.period]
+
+        for worker in job.idle.values():
+            worker.cancel()
+        job.idle.clear()
+        job.queued = None
+
+    def job_stats(self, id: int) -> Dict[str, Any]:
+        return self.jobs[id].stats()
+
+    def stats(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "jobs": len(self.jobs),
+            "wakeups": self.wakeups,
+            "runs": sum(job.runs for job in self.jobs.values()),
+            "overruns": sum(job.overruns for job in self.jobs.values())
+        }
+
+        names: Dict[str, int] = {}
+        for job in self.jobs.values():
+            name = job.name
+            if name in names:
+                name = f"{name}#{job.idx}"
+            names[name] = job.idx
+
+            for key, value in job.stats().items():
+                result[f"{name}.{key}"] = value
+        return result
 
     def close(self):
         for id_job in list(self.jobs.keys()):
+            workers = self.jobs[id_job].workers
             self.remove_recurring(id_job)
+            for worker in workers:
+                worker.cancel()
 
-        for id_task in list(self.running.keys()):
-            self.running[id_task].cancel()
\ No newline at end of file
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
@@ -1,7 +1,10 @@
 from typing import Optional, Sequence, Callable, Awaitable
 
+from streamdeckd import extensions
+
 
 class Signal:
+    label = ""
 
     def configure(self, args: Sequence[str], block: None):
         pass
@@ -22,6 +25,8 @@ def register(name: str):
 
 
 def create(name, args, block):
+    extensions.resolve("signals", name)
     signal = SIGNALS[name]()
+    signal.label = " ".join([name, *args])
     signal.configure(args, block)
     return signal
\ No newline at end of file
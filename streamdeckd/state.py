@@ -1,19 +1,24 @@
 import weakref
-from typing import Optional, Dict, Any, Set, MutableMapping, Callable, Type, Sequence
+from typing import Optional, Dict, Any, Set, MutableMapping, Callable, Type, Sequence, List, Tuple, FrozenSet
 
 
 _UNSET = object()
 _STATE_VARIABLES: MutableMapping[Any, Any] = weakref.WeakKeyDictionary()
+_SLOTS: List['StateVariable'] = []
+_APPLY_TABLES: MutableMapping[Any, Any] = weakref.WeakKeyDictionary()
+
+Plan = Tuple[Tuple['StateVariable', Any], ...]
 
 
 class StateVariable(object):
 
     def __init__(self, default=_UNSET):
         super().__init__()
-        self.state = weakref.WeakKeyDictionary()
         self.default = default
         self._changed = None
         self.name = None
+        self.index = len(_SLOTS)
+        _SLOTS.append(self)
 
     def changed(self, cb):
         self._changed = cb
@@ -23,31 +28,66 @@ class StateVariable(object):
         return data
 
     def __set__(self, owner, data):
-        old = self.state.get(owner, _UNSET)
-        new  = self._convert(data)
+        self.assign(owner, self._convert(data))
+
+    def assign(self, owner, new):
+        values = owner._values
+        if self.index >= len(values):
+            owner._grow()
+            values = owner._values
+
+        old = values[self.index]
         if old == new:
             return
 
-        self.state[owner] = new
+        values[self.index] = new
+        owner._invalidate(self.index, new)
         if self._changed is not None:
             self._changed(owner, old, new)
 
     def __get__(self, instance, owner=None):
-        while isinstance(instance, State):
-            if instance in self.state:
-                return self.state[instance]
-            instance = instance.parent
-        if self.default is _UNSET:
-            raise AttributeError()
+        if not isinstance(instance, State):
+            return self._default()
+
+        resolved = instance._resolved
+        if self.index < len(resolved):
+            value = resolved[self.index]
+            if value is not _UNSET:
+                return value
         else:
-            return self.default
+            instance._grow()
+            resolved = instance._resolved
+
+        value = _UNSET
+        current: Optional[State] = instance
+        while current is not None:
+            if self.index >= len(current._values):
+                current._grow()
+            value = current._values[self.index]
+            if value is not _UNSET:
+                break
+            current = current.parent
+
+        if value is _UNSET:
+            value = self._default()
+        resolved[self.index] = value
+        return value
 
     def __delete__(self, instance):
-        self.state.pop(instance, None)
+        if self.index >= len(instance._values):
+            return
+        instance._values[self.index] = _UNSET
+        instance._invalidate(self.index, _UNSET)
+
+    def _default(self):
+        if self.default is _UNSET:
+            raise AttributeError()
+        return self.default
 
     def __set_name__(self, owner, name):
         self.name = name
         _STATE_VARIABLES.setdefault(owner, []).append(name)
+        _APPLY_TABLES.clear()
 
     @classmethod
     def from_parser(cls, func: Callable[[str], Any]) -> Type['StateVariable']:
@@ -62,27 +102,81 @@ class StateVariable(object):
         return cls.from_parser(func)(default)
 
 
+def _apply_table(cls: Type['State'], exclude_classes: Sequence[Type['State']]) -> List[FrozenSet[str]]:
+    key = tuple(exclude_classes)
+    tables = _APPLY_TABLES.setdefault(cls, {})
+    if key not in tables:
+        tables[key] = [
+            frozenset(_STATE_VARIABLES[klass])
+            for klass in cls.mro()
+            if klass in _STATE_VARIABLES and klass not in exclude_classes
+        ]
+    return tables[key]
+
+
+def _variables_of(cls: Type['State']) -> Dict[str, StateVariable]:
+    result = {}
+    for klass in reversed(cls.mro()):
+        for name in _STATE_VARIABLES.get(klass, ()):
+            result[name] = klass.__dict__[name]
+    return result
+
+
+def compile_plan(cls: Type['State'], *settings: Dict[str, Any]) -> Plan:
+    variables = _variables_of(cls)
+
+    merged: Dict[str, Any] = {}
+    for setting in settings:
+        merged.update((name, value) for name, value in setting.items() if name in variables)
+
+    plan = [(variables[name], variables[name]._convert(value)) for name, value in merged.items()]
+    plan.sort(key=lambda entry: entry[0]._changed is not None)
+    return tuple(plan)
+
+
 class State(object):
 
     def __init__(self, parent: Optional['State']):
         super().__init__()
         self.parent = parent
+        self.children: 'weakref.WeakSet[State]' = weakref.WeakSet()
+        self._values: List[Any] = [_UNSET] * len(_SLOTS)
+        self._resolved: List[Any] = [_UNSET] * len(_SLOTS)
+
+        if parent is not None:
+            parent.children.add(self)
+
+    def _grow(self):
+        missing = len(_SLOTS) - len(self._values)
+        self._values.extend([_UNSET] * missing)
+        self._resolved.extend([_UNSET] * (len(_SLOTS) - len(self._resolved)))
+
+    def _invalidate(self, index: int, value: Any):
+        if index < len(self._resolved):
+            self._resolved[index] = value
+
+        for child in self.children:
+            if index < len(child._values) and child._values[index] is not _UNSET:
+                continue
+            child._invalidate(index, _UNSET)
+
+    def apply_plan(self, plan: Plan):
+        for variable, value in plan:
+            variable.assign(self, value)
 
     def apply(self, settings: Dict[str, Any], unseen: Optional[Set[str]]=None, exclude_classes: Sequence[Type['State']]=()):
         if unseen is None:
             unseen = set(settings.keys())
 
-        for cls in self.__class__.mro():
-            if cls not in _STATE_VARIABLES:
-                continue
-            if cls in exclude_classes:
-                continue
+        for names in _apply_table(self.__class__, exclude_classes):
+            if not unseen:
+                return
 
-            vars_here = unseen & set(_STATE_VARIABLES[cls])
+            vars_here = unseen & names
             for variable in vars_here:
                 setattr(self, variable, settings[variable])
-            
+
             unseen -= vars_here
 
-        if self.parent is not None:
+        if self.parent is not None and unseen:
             self.parent.apply(settings, unseen, exclude_classes=exclude_classes)
@@ -1,10 +1,14 @@
-from typing import TypeVar, Dict, Optional, Callable
+import hashlib
+from typing import TypeVar, Dict, Optional, Callable, Any, Hashable, Tuple, Union
 from datetime import timedelta
 from importlib import import_module
 
 from PIL import Image, ImageColor
 
 from streamdeckd.state import StateVariable
+from streamdeckd import cache
+from streamdeckd.cache import LRUCache
+from streamdeckd.assets import STORE, Asset
 
 
 T = TypeVar("T")
@@ -34,29 +38,65 @@ def parse_timespan(tinfo: str) -> timedelta:
     raise ValueError("Cannot parse timespan.")
 
 
+SIZE_UNITS = {
+    "k": 1024,
+    "m": 1024*1024,
+    "g": 1024*1024*1024
+}
+
+
+def parse_size(sinfo: str) -> int:
+    if sinfo.isnumeric():
+        return int(sinfo)
+    for unit, multiplier in SIZE_UNITS.items():
+        if sinfo.lower().endswith(unit):
+            return int(sinfo[:-len(unit)])*multiplier
+    raise ValueError("Cannot parse size.")
+
+
 def parse_color(data: str):
     return ImageColor.getrgb(data)
 
 
-_IMAGE_CACHE: Dict[str, Image.Image] = {}
+_RESIZE_CACHE: LRUCache[Hashable, Image.Image] = cache.register("resized", LRUCache(16*1024*1024, sizeof=lambda img: img.width * img.height * len(img.getbands())))
 
 
-def parse_img(path: str, sz=None) -> Optional[Image.Image]:
+def parse_img(path: str, sz=None) -> Union[Image.Image, Asset, None]:
     if not path:
         return None
 
-    if path in _IMAGE_CACHE:
-        img = _IMAGE_CACHE[path]
-    else:
-        with open(path, "rb") as f:
-            img = Image.open(f)
-            img = img.copy()
-        _IMAGE_CACHE[path] = img
-
+    asset = STORE.open(path)
     if sz is not None:
-        img = img.resize(sz, Image.BICUBIC)
+        return asset.fitted(sz)
+    return asset
+
+
+def image_key(img: Union[Image.Image, Asset, None]) -> Optional[Hashable]:
+    if img is None:
+        return None
+    if isinstance(img, Asset):
+        return (img.digest,)
+    digest = img.info.get("streamdeckd.digest", None)
+    if digest is None:
+        digest = hashlib.sha1(img.tobytes()).hexdigest()
+        img.info["streamdeckd.digest"] = digest
+    return (digest, img.mode, img.size)
+
+
+def resize_image(img: Image.Image, size: Tuple[int, int], resample: int=Image.BICUBIC) -> Image.Image:
+    size = tuple(size)
+    if img.size == size:
+        return img
 
-    return img
+    key = (image_key(img), size, resample)
+    resized = _RESIZE_CACHE.get(key)
+    if resized is not None:
+        return resized
+
+    resized = img.resize(size, resample)
+    resized.info["streamdeckd.digest"] = f"{img.info['streamdeckd.digest']}@{size[0]}x{size[1]}"
+    _RESIZE_CACHE.put(key, resized)
+    return resized
 
 
 def parse_color_or_img(data: str, sz=None) -> Image.Image:
@@ -79,8 +119,19 @@ ImageStateVariable = StateVariable.from_parser(parse_img)
 
 class LiveVariable:
 
-    def __init__(self, cb: Callable[[], str]):
+    def __init__(self, cb: Callable[[], str], volatile: bool=True):
+        self.cb = cb
+        self.volatile = volatile
+
+    def __format__(self, spec: str):
+        return self.cb().__format__(spec)
+
+class StatsValues:
+    volatile = True
+
+    def __init__(self, cb: Callable[[str], Any]):
         self.cb = cb
 
     def __format__(self, spec: str):
-        return self.cb().__format__(spec)
\ No newline at end of file
+        name, _, spec = spec.partition(":")
+        return format(self.cb(name), spec)
@@ -1,33 +1,226 @@
-from typing import cast, Mapping, Any, Dict
-from collections import UserDict, ChainMap
+import re
+import weakref
+import itertools
+from string import Formatter
+from functools import lru_cache
+from typing import Mapping, Any, Dict, List, Callable, FrozenSet, Iterable, Optional, Tuple, Union
+from collections import UserDict
 
 
-class _EmptyMap(UserDict):
+_UNSET = object()
+_VERSIONS = itertools.count(1)
+_CONVERSIONS = {
+    None: None,
+    "s": str,
+    "r": repr,
+    "a": ascii
+}
+
+
+_FIELD_PART = re.compile(r"\.([^.\[]+)|\[([^\]]+)\]")
+
+
+def split_field(field: str) -> Tuple[Union[str, int], List[Tuple[bool, Union[str, int]]]]:
+    first = re.match(r"[^.\[]*", field).group(0)
+    rest: List[Tuple[bool, Union[str, int]]] = []
+
+    pos = len(first)
+    while pos < len(field):
+        match = _FIELD_PART.match(field, pos)
+        if match is None:
+            raise ValueError(f"Invalid field name '{field}' in format string")
+        if match.group(1) is not None:
+            rest.append((True, match.group(1)))
+        else:
+            key = match.group(2)
+            rest.append((False, int(key) if key.isdigit() else key))
+        pos = match.end()
+
+    return (int(first) if first.isdigit() else first), rest
+
+
+class Template:
+
+    def __init__(self, string: str):
+        self.string = string
+        self.parts: List[Tuple[str, Optional[Union[str, int]], Tuple[Tuple[bool, Any], ...], Optional[Callable[[Any], str]], Union[str, 'Template']]] = []
+
+        names = set()
+        for literal, field, spec, conversion in Formatter().parse(string):
+            if field is None:
+                self.parts.append((literal, None, (), None, ""))
+                continue
+
+            first, rest = split_field(field)
+            if conversion not in _CONVERSIONS:
+                raise ValueError(f"Unknown conversion specifier {conversion}")
+
+            if isinstance(first, str) and first:
+                names.add(first)
+            if spec and "{" in spec:
+                spec = compile_template(spec)
+                names |= spec.names
+
+            self.parts.append((literal, first, tuple(rest), _CONVERSIONS[conversion], spec))
+
+        self.names: FrozenSet[str] = frozenset(names)
+
+    def render(self, variables: Mapping[str, Any]) -> str:
+        result = []
+        for literal, first, rest, conversion, spec in self.parts:
+            if literal:
+                result.append(literal)
+            if first is None:
+                continue
+            if not isinstance(first, str) or not first:
+                raise IndexError(f"Replacement index {first or 0} out of range for positional args tuple")
+
+            obj = variables[first]
+            for is_attr, key in rest:
+                if is_attr:
+                    obj = getattr(obj, key)
+                else:
+                    obj = obj[key]
+
+            if conversion is not None:
+                obj = conversion(obj)
+            if isinstance(spec, Template):
+                spec = spec.render(variables)
+
+            result.append(format(obj, spec))
+        return "".join(result)
+
+
+@lru_cache(maxsize=4096)
+def compile_template(string: str) -> Template:
+    return Template(string)
+
+
+def template_names(string: str) -> FrozenSet[str]:
+    try:
+        return compile_template(string).names
+    except ValueError:
+        return frozenset()
+
+
+def _weak_callback(cb: Callable[[str], None]) -> Callable[[], Callable[[str], None]]:
+    if hasattr(cb, "__self__"):
+        return weakref.WeakMethod(cb)
+    return lambda: cb
 
-    def __init__(self):
-        super().__init__({})
 
+class _Observable:
 
-class Variables(UserDict):
+    def __init__(self, *args, **kwargs):
+        self.listeners: List[Callable[[], Callable[[str], None]]] = []
+        super().__init__(*args, **kwargs)
+
+    def subscribe(self, cb: Callable[[str], None]):
+        self.listeners.append(_weak_callback(cb))
+
+    def unsubscribe(self, cb: Callable[[str], None]):
+        self.listeners = [ref for ref in self.listeners if ref() not in (None, cb)]
+
+    def notify(self, name: str):
+        dead = False
+        for ref in list(self.listeners):
+            cb = ref()
+            if cb is None:
+                dead = True
+                continue
+            cb(name)
+
+        if dead:
+            self.listeners = [ref for ref in self.listeners if ref() is not None]
+
+
+class ObservableDict(_Observable, UserDict):
+
+    def __setitem__(self, key: str, value: Any):
+        old = self.data.get(key, _UNSET)
+        self.data[key] = value
+        if old is _UNSET or old != value:
+            self.notify(key)
+
+    def __delitem__(self, key: str):
+        del self.data[key]
+        self.notify(key)
+
+
+class Variables(_Observable, UserDict):
 
     def __init__(self):
         super().__init__()
-        self.maps = []
-        self.add_map(_EmptyMap())
+        self.maps: List[Mapping[Any, Any]] = []
+
+        self.versions: Dict[str, int] = {}
+        self._formatted: Dict[str, Tuple[int, str]] = {}
+
+    def _resolve(self, key: str) -> Any:
+        for map in reversed(self.maps):
+            if key in map:
+                return map[key]
+        return _UNSET
+
+    def _update(self, key: str):
+        value = self._resolve(key)
+        if value is self.data.get(key, _UNSET):
+            return
+
+        if value is _UNSET:
+            del self.data[key]
+        else:
+            self.data[key] = value
+
+        self.versions[key] = next(_VERSIONS)
+        self.notify(key)
 
     def add_map(self, map: Mapping[Any, Any]):
         self.maps.append(map)
-        self.data = cast(Dict[Any, Any], ChainMap(*reversed(self.maps)))
-    
+
+        if isinstance(map, _Observable):
+            map.subscribe(self._update)
+        for key in list(map.keys()):
+            self._update(key)
+
     def remove_map(self, map: Mapping[Any, Any]):
         while map in self.maps:
             self.maps.remove(map)
-        self.data = cast(Dict[Any, Any], ChainMap(*reversed(self.maps)))
+
+        if isinstance(map, _Observable):
+            map.unsubscribe(self._update)
+        for key in list(map.keys()):
+            self._update(key)
+
+    def detach(self):
+        for map in self.maps:
+            if isinstance(map, _Observable):
+                map.unsubscribe(self._update)
 
     def make_child(self) -> 'Variables':
         result = Variables()
         result.add_map(self)
         return result
 
+    def version_of(self, names: Iterable[str]) -> int:
+        return max((self.versions.get(name, 0) for name in names), default=0)
+
+    def is_volatile(self, names: Iterable[str]) -> bool:
+        for name in names:
+            if getattr(self.data.get(name, None), "volatile", False):
+                return True
+        return False
+
     def format(self, string: str) -> str:
-        return string.format(**self)
\ No newline at end of file
+        template = compile_template(string)
+        if self.is_volatile(template.names):
+            return template.render(self.data)
+
+        version = self.version_of(template.names)
+        cached = self._formatted.get(string, None)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        result = template.render(self.data)
+        self._formatted[string] = (version, result)
+        return result
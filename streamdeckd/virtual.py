@@ -0,0 +1,225 @@
+import time
+import asyncio
+from asyncio import AbstractEventLoop
+from typing import Optional, Sequence, List, Dict, Tuple, Callable, Iterable, Any
+
+from streamdeckd.devices import DeviceSource, DeviceInfo
+
+
+DECK_TYPES: Dict[str, Dict[str, Any]] = {
+    "mini": {
+        "deck_type": "Stream Deck Mini",
+        "layout": (2, 3),
+        "size": (80, 80),
+        "format": "BMP",
+        "flip": (False, True),
+        "rotation": 90
+    },
+    "original": {
+        "deck_type": "Stream Deck Original",
+        "layout": (3, 5),
+        "size": (72, 72),
+        "format": "BMP",
+        "flip": (True, True),
+        "rotation": 0
+    },
+    "original2": {
+        "deck_type": "Stream Deck Original",
+        "layout": (3, 5),
+        "size": (72, 72),
+        "format": "JPEG",
+        "flip": (True, True),
+        "rotation": 0
+    },
+    "xl": {
+        "deck_type": "Stream Deck XL",
+        "layout": (4, 8),
+        "size": (96, 96),
+        "format": "JPEG",
+        "flip": (True, True),
+        "rotation": 0
+    }
+}
+
+_MAGIC = {
+    "BMP": b"BM",
+    "JPEG": b"\xff\xd8"
+}
+
+
+class VirtualStreamDeck(object):
+
+    def __init__(self, kind: str, serial: str, firmware: str="virtual"):
+        super().__init__()
+        if kind not in DECK_TYPES:
+            raise ValueError(f"Unknown virtual deck type: {kind}")
+
+        self.kind = kind
+        self.serial = serial
+        self.firmware = firmware
+        self.spec = DECK_TYPES[kind]
+
+        self.opened = False
+        self.brightness: Optional[float] = None
+        self.images: Dict[int, bytes] = {}
+        self.key_states: List[bool] = [False] * self.key_count()
+
+        self.key_writes: List[Tuple[float, int, int]] = []
+        self.brightness_writes: List[Tuple[float, float]] = []
+        self.presses: List[Tuple[float, int, bool]] = []
+
+        self._callback: Optional[Callable[['VirtualStreamDeck', int, bool], Any]] = None
+        self._loop: Optional[AbstractEventLoop] = None
+
+    def id(self) -> str:
+        return self.serial
+
+    def open(self) -> None:
+        self.opened = True
+
+    def close(self) -> None:
+        self.opened = False
+
+    def is_open(self) -> bool:
+        return self.opened
+
+    def connected(self) -> bool:
+        return True
+
+    def reset(self) -> None:
+        self.images.clear()
+
+    def deck_type(self) -> str:
+        return self.spec["deck_type"]
+
+    def is_visual(self) -> bool:
+        return True
+
+    def key_layout(self) -> Tuple[int, int]:
+        return self.spec["layout"]
+
+    def key_count(self) -> int:
+        rows, cols = self.spec["layout"]
+        return rows * cols
+
+    def key_image_format(self) -> Dict[str, Any]:
+        return {
+            "size": self.spec["size"],
+            "format": self.spec["format"],
+            "flip": self.spec["flip"],
+            "rotation": self.spec["rotation"]
+        }
+
+    def get_serial_number(self) -> str:
+        return self.serial
+
+    def get_firmware_version(self) -> str:
+        return self.firmware
+
+    def set_key_callback(self, callback: Optional[Callable[['VirtualStreamDeck', int, bool], Any]]) -> None:
+        self._callback = callback
+
+    def set_key_callback_async(self, callback: Callable[['VirtualStreamDeck', int, bool], Any], loop: Optional[AbstractEventLoop]=None) -> None:
+        self._callback = callback
+        self._loop = loop or asyncio.get_event_loop()
+
+    def set_brightness(self, percent: float) -> None:
+        self._check_open()
+        self.brightness = percent
+        self.brightness_writes.append((time.perf_counter(), percent))
+
+    def set_key_image(self, key: int, image: Optional[bytes]) -> None:
+        self._check_open()
+        if not 0 <= key < self.key_count():
+            raise IndexError(f"Invalid key index {key}.")
+
+        image = bytes(image or b"")
+        if image and not image.startswith(_MAGIC[self.spec["format"]]):
+            raise ValueError(f"Key {key} image is not encoded as {self.spec['format']}.")
+
+        self.images[key] = image
+        self.key_writes.append((time.perf_counter(), key, len(image)))
+
+    def _check_open(self) -> None:
+        if not self.opened:
+            raise IOError(f"Virtual deck {self.serial} is not open.")
+
+    def press(self, key: int, pressed: bool=True) -> Optional[asyncio.Future]:
+        if not 0 <= key < self.key_count():
+            raise IndexError(f"Invalid key index {key}.")
+
+        self.key_states[key] = pressed
+        self.presses.append((time.perf_counter(), key, pressed))
+        if self._callback is None:
+            return None
+
+        result = self._callback(self, key, pressed)
+        if asyncio.iscoroutine(result):
+            return asyncio.run_coroutine_threadsafe(result, self._loop) if self._loop is not None else None
+        return None
+
+    async def tap(self, key: int, hold: float=0.05) -> None:
+        self.press(key, True)
+        await asyncio.sleep(hold)
+        self.press(key, False)
+
+    async def play(self, script: Iterable[Tuple[float, int, bool]]) -> None:
+        for delay, key, pressed in script:
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.press(key, pressed)
+
+    def bytes_written(self) -> int:
+        return sum(size for _, _, size in self.key_writes)
+
+    def clear_records(self) -> None:
+        self.key_writes.clear()
+        self.brightness_writes.clear()
+        self.presses.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "writes": len(self.key_writes),
+            "bytes": self.bytes_written(),
+            "presses": len(self.presses)
+        }
+
+
+class VirtualDeviceSource(DeviceSource):
+
+    def __init__(self):
+        super().__init__()
+        self.decks: Dict[str, VirtualStreamDeck] = {}
+
+    def add(self, kind: str="original", serial: Optional[str]=None) -> VirtualStreamDeck:
+        if serial is None:
+            serial = f"{kind}.{len(self.decks)}"
+        if serial not in self.decks:
+            self.decks[serial] = VirtualStreamDeck(kind, serial)
+        return self.decks[serial]
+
+    def remove(self, serial: str) -> None:
+        self.decks.pop(serial, None)
+
+    def rescan(self) -> Sequence[str]:
+        return list(self.decks)
+
+    def get_scanned(self, identifier: str) -> Optional[VirtualStreamDeck]:
+        return self.decks.get(identifier)
+
+    def get_info(self, identifier: str) -> Optional[DeviceInfo]:
+        deck = self.decks.get(identifier)
+        if deck is None:
+            return None
+        return DeviceInfo(deck.id(), deck.serial, deck.firmware, deck.deck_type(), deck.key_layout())
+
+    def matches(self, identifier: str, deck: Any) -> bool:
+        return isinstance(deck, VirtualStreamDeck) and self.decks.get(identifier) is deck
+
+    def request(self, user_identifier: str) -> None:
+        kind = user_identifier.split(".", 1)[0]
+        if kind in DECK_TYPES:
+            self.add(kind, user_identifier)
+
+    def enumerate(self) -> Sequence[VirtualStreamDeck]:
+        return list(self.decks.values())
@@ -0,0 +1,165 @@
+import time
+import logging
+import threading
+from collections import deque
+from asyncio import AbstractEventLoop, Future
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+from StreamDeck.Devices.StreamDeck import StreamDeck
+
+
+_STOP = object()
+
+
+class _Command:
+    __slots__ = ("func", "args", "future", "queued_at")
+
+    def __init__(self, func: Callable[..., Any], args: Tuple[Any, ...], future: Optional[Future]):
+        self.func = func
+        self.args = args
+        self.future = future
+        self.queued_at = time.perf_counter()
+
+
+class DeviceWriter:
+
+    def __init__(self, deck: StreamDeck, loop: AbstractEventLoop, max_queue: int=64):
+        super().__init__()
+        self.deck = deck
+        self.loop = loop
+        self.max_queue = max_queue
+        self.logger = logging.getLogger("streamdeckd.writer")
+
+        self._cond = threading.Condition()
+        self._queue: Deque[Any] = deque()
+        self._slots: Dict[Hashable, _Command] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._space: Deque[Future] = deque()
+        self.failed: Optional[Callable[[Hashable], None]] = None
+
+        self.commands = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._run, name=f"streamdeckd-writer-{self.deck.id()!r}", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if self._thread is None:
+            return
+
+        await self.flush()
+        with self._cond:
+            self._queue.append(_STOP)
+            self._cond.notify()
+        self._thread = None
+
+    def _push(self, item: Any) -> None:
+        self._queue.append(item)
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._cond.notify()
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        fut = self.loop.create_future()
+        with self._cond:
+            self._push(_Command(func, args, fut))
+        return fut
+
+    async def call(self, func: Callable[..., Any], *args: Any) -> Any:
+        while len(self._queue) >= self.max_queue:
+            waiter = self.loop.create_future()
+            self._space.append(waiter)
+            await waiter
+
+        return await self.submit(func, *args)
+
+    def coalesce(self, slot: Hashable, func: Callable[..., Any], *args: Any) -> None:
+        command = _Command(func, args, None)
+        with self._cond:
+            if slot in self._slots:
+                command.queued_at = self._slots[slot].queued_at
+                self._slots[slot] = command
+                self.coalesced += 1
+                return
+
+            self._slots[slot] = command
+            self._push(slot)
+
+    def set_key_image(self, key: int, raw: bytes) -> None:
+        self.coalesce(("key", key), self.deck.set_key_image, key, raw)
+
+    def set_brightness(self, brightness: float) -> None:
+        self.coalesce("brightness", self.deck.set_brightness, brightness)
+
+    def reset(self) -> Future:
+        with self._cond:
+            self._queue = deque(item for item in self._queue if isinstance(item, _Command) or item is _STOP)
+            self._slots.clear()
+        return self.submit(self.deck.reset)
+
+    async def flush(self) -> None:
+        await self.submit(lambda: None)
+
+    def _resolve(self, fut: Future, result: Any, exc: Optional[BaseException]) -> None:
+        if fut.done():
+            return
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(result)
+
+    def _wake_waiters(self) -> None:
+        while self._space and len(self._queue) < self.max_queue:
+            waiter = self._space.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+
+                item = self._queue.popleft()
+                if item is _STOP:
+                    return
+                slot = None
+                if not isinstance(item, _Command):
+                    slot = item
+                    item = self._slots.pop(slot)
+
+            result, exc = None, None
+            try:
+                result = item.func(*item.args)
+            except Exception as e:
+                exc = e
+                if item.future is None:
+                    self.logger.error(f"Device write failed: {e!r}")
+
+            latency = time.perf_counter() - item.queued_at
+            self.commands += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+            if item.future is not None:
+                self.loop.call_soon_threadsafe(self._resolve, item.future, result, exc)
+            elif exc is not None and self.failed is not None:
+                self.loop.call_soon_threadsafe(self.failed, slot)
+            if self._space:
+                self.loop.call_soon_threadsafe(self._wake_waiters)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._queue),
+            "queue_max_depth": self.max_depth,
+            "commands": self.commands,
+            "coalesced": self.coalesced,
+            "latency_mean": (self.latency_total / self.commands) if self.commands else 0.0,
+            "latency_max": self.latency_max
+        }
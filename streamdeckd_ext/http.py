@@ -7,6 +7,7 @@ import aiohttp
 from jsonpath_ng import parse as parse_jsonpath
 
 from streamdeckd.application import Streamdeckd
+from streamdeckd.variables import ObservableDict
 from streamdeckd.signals import Signal, register as register_signal
 
 from streamdeckd.config.base import Context
@@ -15,9 +16,13 @@ from streamdeckd.config.application import ApplicationContext
 from streamdeckd.config.action import ActionableContext, ActionContext
 
 
-USER_VARS = {}
+MANIFEST = {
+    "actions": ["http", "websocket"]
+}
+
+USER_VARS = ObservableDict()
 SOCKETS = {}
-CLIENT_SESSION = aiohttp.ClientSession()
+CLIENT_SESSION: Optional[aiohttp.ClientSession] = None
 WS_CTX_MGR = contextlib.AsyncExitStack()
 
 
@@ -195,10 +200,13 @@ class RequestContext(BaseRequestContext):
 
     @validated(min_args=1, max_args=1, with_block=False)
     def on_variable(self, args, block):
-        USER_VARS[args[0]] = ""
+        USER_VARS.setdefault(args[0], "")
         self.variable = args[0]
 
     async def apply_actions(self, app, __):
+        if app.hermetic:
+            return
+
         uri = app.variables.format(self.uri)
         body = app.variables.format(self.body)
 
@@ -226,6 +234,8 @@ class HttpActionContext(ActionContext):
         @self.actions.append
         @ActionableContext.simple
         async def _ws_op(app, __):
+            if app.hermetic:
+                return
             payload = app.variables.format(payload)
             await WEBSOCKET[args[0]]["ws"].send_str(payload)
 
@@ -247,7 +257,10 @@ async def start(app: Streamdeckd):
     global CLIENT_SESSION
 
     app.variables.add_map(USER_VARS)
+    app.variable_maps["http"] = USER_VARS
     await WS_CTX_MGR.__aenter__()
+    if app.hermetic:
+        return
 
     CLIENT_SESSION = await WS_CTX_MGR.enter_async_context(aiohttp.ClientSession())
     for sock in SOCKETS.values():
@@ -256,6 +269,7 @@ async def start(app: Streamdeckd):
 
 async def stop(app: Streamdeckd):
     app.variables.remove_map(USER_VARS)
+    app.variable_maps.pop("http", None)
     await asyncio.sleep(0.25)
 
     await WS_CTX_MGR.__aexit__(None, None, None)
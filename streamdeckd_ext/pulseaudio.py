@@ -9,6 +9,11 @@ from streamdeckd.config.application import ApplicationContext
 from streamdeckd.config.action import ActionableContext, ActionContext
 
 
+MANIFEST = {
+    "actions": ["pa_volume", "pa_mute"],
+    "variables": ["pulse"]
+}
+
 PULSE_INSTANCE: pulsectl.Pulse = None
 
 
@@ -23,6 +28,7 @@ class PulseStream:
 
 
 class PulseValues:
+    volatile = True
 
     def __format__(self, spec):
         name, spec = spec.split(":", 1)
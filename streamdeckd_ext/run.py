@@ -1,13 +1,18 @@
 import asyncio
 
 from streamdeckd.application import Streamdeckd
+from streamdeckd.variables import ObservableDict
 from streamdeckd.config.application import ApplicationContext
 
 from streamdeckd.config.action import ActionableContext, ActionContext
 from streamdeckd.config.validators import validated
 
 
-EXITCODE_VARS = {}
+MANIFEST = {
+    "actions": ["run"]
+}
+
+EXITCODE_VARS = ObservableDict()
 
 
 class SimpleActions(ActionContext):
@@ -17,11 +22,13 @@ class SimpleActions(ActionContext):
         if len(args) == 2:
             exitvar = args[1]
 
-        EXITCODE_VARS[exitvar] = ""
+        EXITCODE_VARS.setdefault(exitvar, "")
 
         @self.actions.append
         @ActionableContext.simple
         async def _op(app: Streamdeckd, _):
+            if app.hermetic:
+                return
             command = app.variables.format(args[0])
             run = await asyncio.create_subprocess_shell(command)
             exitcode = await run.wait()
@@ -33,6 +40,8 @@ def load(app: Streamdeckd, ctx: ApplicationContext):
 
 async def start(app: Streamdeckd):
     app.variables.add_map(EXITCODE_VARS)
+    app.variable_maps["run"] = EXITCODE_VARS
 
 async def stop(app: Streamdeckd):
     app.variables.remove_map(EXITCODE_VARS)
+    app.variable_maps.pop("run", None)
@@ -1,13 +1,18 @@
-from streamdeckd.variables import Variables
+from streamdeckd.variables import Variables, ObservableDict
 from streamdeckd.application import Streamdeckd
 from streamdeckd.config.validators import validated
 from streamdeckd.config.application import ApplicationContext
 
 
-USER_VARS = {}
+MANIFEST = {
+    "directives": ["split_variable"]
+}
+
+USER_VARS = ObservableDict()
 
 
 class SplitAccessor:
+    volatile = True
 
     def __init__(self, app, text, split):
         self.app = app
@@ -36,6 +41,8 @@ def load(app: Streamdeckd, ctx: ApplicationContext):
 
 async def start(app: Streamdeckd):
     app.variables.add_map(USER_VARS)
+    app.variable_maps["strings"] = USER_VARS
 
 async def stop(app: Streamdeckd):
     app.variables.remove_map(USER_VARS)
+    app.variable_maps.pop("strings", None)
@@ -2,6 +2,7 @@ import asyncio
 
 from streamdeckd.utils import parse_timespan
 from streamdeckd.application import Streamdeckd
+from streamdeckd.variables import ObservableDict, template_names
 from streamdeckd.signals import Signal, register as register_signal
 from streamdeckd.config.application import ApplicationContext
 
@@ -9,7 +10,12 @@ from streamdeckd.config.action import ActionableContext, ActionContext, Sequenti
 from streamdeckd.config.validators import validated
 
 
-CUSTOM_VARS = {}
+MANIFEST = {
+    "actions": ["exit", "reload", "delay", "log", "set", "emit", "if", "while"],
+    "signals": ["custom", "when", "changed"]
+}
+
+CUSTOM_VARS = ObservableDict()
 SIGNALS = {}
 
 
@@ -19,69 +25,165 @@ class ExitAction(ActionableContext):
     def on_exit(self, args, block):
         pass
 
-    async def apply_actions(self, _, __):
-        asyncio.get_running_loop().stop()
+    async def apply_actions(self, app, __):
+        app.request_exit()
 
 
-class WhenSignal(Signal):
+class ReloadAction(ActionableContext):
 
-    def __init__(self, app: Streamdeckd):
-        self.app = app
-        self.sigs = {}
+    @validated(min_args=0, max_args=0, with_block=False)
+    def on_reload(self, args, block):
+        pass
 
-    @validated(min_args=1, max_args=1)
-    def configure(self, args, _):
-        self.lhs, self.op, self.rhs = args
+    async def apply_actions(self, app, __):
+        asyncio.get_running_loop().create_task(app.reload())
 
-    def register(self, cb):
-        last_value = [None, None]
-        async def _check(self):
-            nonlocal last_value
-            current_value_lhs = self.app.variables.format(self.lhs)
-            current_value_rhs = self.app.variables.format(self.rhs)
-            if [current_value_lhs, current_value_rhs] == last_value:
+
+class _Watch:
+
+    def __init__(self, signal: 'TemplateSignal', cb):
+        self.signal = signal
+        self.app = signal.app
+        self.cb = cb
+        self.names = frozenset().union(*(template_names(t) for t in signal.templates()))
+
+        self.version = None
+        self.last_value = None
+        self.last_check = 0.0
+        self.handle = None
+        self.job = None
+
+    def start(self):
+        if self.app.variables.is_volatile(self.names):
+            self.job = self.app.scheduler.add_recurring(0.1, self.check)
+            return
+
+        self.app.variables.subscribe(self.changed)
+        self.handle = asyncio.get_running_loop().call_soon(self._check_now)
+
+    def stop(self):
+        if self.job is not None:
+            self.app.scheduler.remove_recurring(self.job)
+            self.job = None
+
+        self.app.variables.unsubscribe(self.changed)
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+    def changed(self, name: str):
+        if name not in self.names:
+            return
+
+        loop = asyncio.get_running_loop()
+        if self.signal.debounce is not None:
+            if self.handle is not None:
+                self.handle.cancel()
+            self.handle = loop.call_later(self.signal.debounce, self._check_now)
+            return
+
+        if self.handle is not None:
+            return
+
+        delay = 0.0
+        if self.signal.throttle is not None:
+            delay = max(self.last_check + self.signal.throttle - loop.time(), 0.0)
+
+        if delay:
+            self.handle = loop.call_later(delay, self._check_now)
+        else:
+            self.handle = loop.call_soon(self._check_now)
+
+    def _check_now(self):
+        self.handle = None
+        asyncio.get_running_loop().create_task(self.check())
+
+    async def check(self):
+        self.last_check = asyncio.get_running_loop().time()
+
+        if self.job is None:
+            version = self.app.variables.version_of(self.names)
+            if version == self.version:
                 return
-            last_value = [current_value_lhs, current_value_rhs]
-            if check_conj(current_value_lhs, current_value_rhs, self.op):
-                await cb()
+            self.version = version
 
-        self.sigs[cb] = self.app.scheduler.add_recurring(0.1, _check)
+        TemplateSignal.evaluations += 1
+        current_value = self.signal.evaluate()
+        if current_value == self.last_value:
+            return
+        self.last_value = current_value
 
-    def unregister(self, cb):
-        handle = self.sigs.pop(cb, None)
-        if handle is None:
-            self.app.scheduler.remove_recurring(handle)
+        if self.signal.triggered(current_value):
+            await self.cb()
 
 
-class ChangedSignal(Signal):
+class TemplateSignal(Signal):
+    evaluations = 0
 
     def __init__(self, app: Streamdeckd):
         self.app = app
         self.sigs = {}
+        self.debounce = None
+        self.throttle = None
 
-    @validated(min_args=1, max_args=1)
-    def configure(self, args, _):
-        self.data = args[0]
+    def configure_timing(self, args):
+        if len(args) % 2 != 0:
+            raise ValueError("Expected pairs of 'debounce' or 'throttle' and a timespan")
 
-    def register(self, cb):
-        last_value = None
+        for option, value in zip(args[::2], args[1::2]):
+            if option == "debounce":
+                self.debounce = parse_timespan(value).total_seconds()
+            elif option == "throttle":
+                self.throttle = parse_timespan(value).total_seconds()
+            else:
+                raise ValueError(f"Unknown option {option}")
 
-        async def _check():
-            nonlocal last_value
+    def templates(self):
+        return []
 
-            current_value = self.app.variables.format(self.data)
-            if current_value == last_value:
-                return
-            last_value = current_value
+    def evaluate(self):
+        return [self.app.variables.format(template) for template in self.templates()]
 
-            await cb()
+    def triggered(self, value) -> bool:
+        return True
 
-        self.sigs[cb] = self.app.scheduler.add_recurring(0.1, _check)
+    def register(self, cb):
+        if cb in self.sigs:
+            return
+
+        watch = _Watch(self, cb)
+        self.sigs[cb] = watch
+        watch.start()
 
     def unregister(self, cb):
-        handle = self.sigs.pop(cb, None)
-        if handle is not None:
-            self.app.scheduler.remove_recurring(handle)
+        watch = self.sigs.pop(cb, None)
+        if watch is not None:
+            watch.stop()
+
+
+class WhenSignal(TemplateSignal):
+
+    @validated(min_args=3)
+    def configure(self, args, _):
+        self.lhs, self.op, self.rhs = args[:3]
+        self.configure_timing(args[3:])
+
+    def templates(self):
+        return [self.lhs, self.rhs]
+
+    def triggered(self, value) -> bool:
+        return check_conj(value[0], value[1], self.op)
+
+
+class ChangedSignal(TemplateSignal):
+
+    @validated(min_args=1)
+    def configure(self, args, _):
+        self.data = args[0]
+        self.configure_timing(args[1:])
+
+    def templates(self):
+        return [self.data]
 
 
 class CustomSignals(Signal):
@@ -91,14 +193,14 @@ class CustomSignals(Signal):
     @validated(min_args=1, max_args=1)
     def configure(self, args, _):
         self._name = args[0]
-        SIGNALS[args[0]] = []
+        SIGNALS.setdefault(args[0], [])
 
     def register(self, cb):
-        if cb not in SIGNALS:
+        if cb not in SIGNALS[self._name]:
             SIGNALS[self._name].append(cb)
 
     def unregister(self, cb):
-        while cb in SIGNALS:
+        while cb in SIGNALS[self._name]:
             SIGNALS[self._name].remove(cb)
 
 
@@ -123,7 +225,7 @@ class SimpleActions(ActionContext):
 
     @validated(min_args=2, max_args=2, with_block=False)
     def on_set(self, args, block):
-        CUSTOM_VARS[args[0]] = ""
+        CUSTOM_VARS.setdefault(args[0], "")
 
         @self.actions.append
         @ActionableContext.simple
@@ -203,6 +305,7 @@ class WhileAction(ActionContext):
 
 def load(app: Streamdeckd, ctx: ApplicationContext):
     ActionContext.register(ExitAction)
+    ActionContext.register(ReloadAction)
     ActionContext.register(SimpleActions)
 
     ActionContext.register(IfAction)
@@ -214,6 +317,10 @@ def load(app: Streamdeckd, ctx: ApplicationContext):
 
 async def start(app: Streamdeckd):
     app.variables.add_map(CUSTOM_VARS)
+    app.variable_maps["system"] = CUSTOM_VARS
+    app.stats["signals"] = lambda: {"evaluations": TemplateSignal.evaluations}
 
 async def stop(app: Streamdeckd):
     app.variables.remove_map(CUSTOM_VARS)
+    app.variable_maps.pop("system", None)
+    app.stats.pop("signals", None)
@@ -2,6 +2,9 @@ from streamdeckd.application import Streamdeckd
 from streamdeckd.config.application import ApplicationContext
 
 
+MANIFEST = {}
+
+
 def load(app: Streamdeckd, ctx: ApplicationContext):
     pass
 
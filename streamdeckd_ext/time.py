@@ -7,7 +7,15 @@ from streamdeckd.config.validators import validated
 from streamdeckd.config.application import ApplicationContext
 
 
+MANIFEST = {
+    "signals": ["every"],
+    "variables": ["now"]
+}
+
+
 class CurrentTime:
+    volatile = True
+
     def __format__(self, spec):
         return datetime.datetime.now().__format__(spec)
 
@@ -18,15 +26,37 @@ class EverySignal(Signal):
         self.ts = None
         self.id = None
 
-    @validated(min_args=1, max_args=1)
+    @validated(min_args=1, max_args=3)
     def configure(self, args, _):
         self.ts = parse_timespan(args[0])
+        if self.ts.total_seconds() <= 0:
+            raise ValueError(f"every: Period must be positive, got '{args[0]}'")
+
+        self.policy = "skip"
+        self.concurrency = 1
+        if len(args) >= 2:
+            self.policy = args[1]
+            if self.policy not in {"skip", "queue", "concurrent"}:
+                raise ValueError(f"every: Unknown overrun policy '{self.policy}'")
+            if self.policy == "concurrent":
+                if len(args) != 3:
+                    raise ValueError("every: concurrent requires a limit")
+                self.concurrency = int(args[2])
+                if self.concurrency < 1:
+                    raise ValueError(f"every: Concurrency limit must be at least 1, got '{args[2]}'")
+            elif len(args) == 3:
+                raise ValueError(f"every: {self.policy} does not accept a limit")
 
     def register(self, cb):
         if self.id is not None:
             return
 
-        self.id = self.app.scheduler.add_recurring(self.ts, cb)
+        self.id = self.app.scheduler.add_recurring(
+            self.ts, cb,
+            policy=self.policy,
+            concurrency=self.concurrency,
+            name=f"every.{self.ts.total_seconds():g}s"
+        )
 
     def unregister(self, cb):
         if self.id is None: